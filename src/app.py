@@ -2,6 +2,7 @@
 import sys
 import threading
 import time
+import orjson
 from flask import Flask, request, jsonify
 from datetime import datetime, timezone
 from typing import Optional
@@ -220,8 +221,8 @@ def missive_webhook():
             logger.warning("Invalid Missive webhook signature")
             return jsonify({"error": "Invalid signature"}), 401
         
-        # Parse JSON
-        data = request.get_json()
+        # Parse JSON from the raw body already read for signature verification
+        data = orjson.loads(payload) if payload else None
         if not data:
             return jsonify({"error": "No JSON payload"}), 400
         
@@ -1,12 +1,17 @@
 """Craft API client supporting both Multi-Document and Full Space APIs."""
 import time
 from typing import List, Dict, Any, Optional
+import orjson
 import requests
 
 from src import settings
 from src.logging_conf import logger
+from src.connectors.http_session import pooled_session
 from src.connectors.craft_markdown_parser import parse_craft_markdown
 
+# Module-level session: clients are recreated with handlers, the connection pool is not
+_SESSION = pooled_session()
+
 
 class CraftClient:
     """Client for Craft Connect API.
@@ -22,7 +27,7 @@ class CraftClient:
     def __init__(self):
         self.base_url = settings.CRAFT_BASE_URL
         self.api_mode = settings.CRAFT_API_MODE
-        self.session = requests.Session()
+        self.session = _SESSION
     
     def is_configured(self) -> bool:
         """Check if Craft API is configured."""
@@ -436,7 +441,7 @@ class CraftClient:
             # Return appropriate format based on accept header
             if accept == "text/markdown":
                 return response.text
-            return response.json()
+            return orjson.loads(response.content)
         
         except requests.exceptions.RequestException as e:
             logger.error(f"Craft API request failed: {e}", exc_info=True)
@@ -449,5 +454,9 @@ class CraftClient:
                 return self._request(method, endpoint, params, json_data, accept, retry_count + 1)
             
             return None
+        
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Craft API returned invalid JSON for {url}: {e}")
+            return None
 
 
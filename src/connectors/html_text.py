@@ -0,0 +1,99 @@
+"""HTML to plain text conversion for Missive message bodies."""
+from collections import OrderedDict
+from html import unescape
+import hashlib
+import re
+import threading
+
+
+# Precompiled patterns for _convert
+_RE_SCRIPT_STYLE = re.compile(r'<(script|style)[^>]*>.*?</\1>', re.DOTALL | re.IGNORECASE)
+# Closing block tags and <br> variants both become newlines
+_RE_LINE_BREAK = re.compile(r'</(?:div|p|br|tr|h[1-6]|li)>|<br\s*/?>', re.IGNORECASE)
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_SPACES = re.compile(r' +')
+
+# Entities that make up nearly all email HTML, with their unescape() results.
+# &amp; comes last so the '&' it produces is never read as part of another entity.
+_COMMON_ENTITIES = (
+    ("&lt;", "<"), ("&gt;", ">"), ("&quot;", '"'), ("&#39;", "'"),
+    ("&nbsp;", "\xa0"), ("&amp;", "&"),
+)
+
+# LRU of converted bodies keyed by content digest (quoted replies and templated
+# emails repeat across conversation re-fetches, and the handler and the message
+# upsert both convert the same body)
+_CACHE_SIZE = 1024
+_cache: "OrderedDict[bytes, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def html_to_text(html: str) -> str:
+    """Convert HTML to plain text (memoized by content digest)."""
+    if not html:
+        return ""
+
+    key = hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _cache_lock:
+        text = _cache.get(key)
+        if text is not None:
+            _cache.move_to_end(key)
+            return text
+
+    text = _convert(html)
+
+    with _cache_lock:
+        _cache[key] = text
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
+
+
+def _unescape(text: str) -> str:
+    """html.unescape, using plain replacements when only common entities occur."""
+    counts = [text.count(entity) for entity, _ in _COMMON_ENTITIES]
+    if sum(counts) != text.count('&'):
+        return unescape(text)
+    for (entity, char), count in zip(_COMMON_ENTITIES, counts):
+        if count:
+            text = text.replace(entity, char)
+    return text
+
+
+def _convert(html: str) -> str:
+    """Convert HTML to plain text."""
+    text = html
+    # Plain-text bodies have no tags to strip; skip the tag passes entirely
+    if '<' in text:
+        # Remove script and style elements
+        text = _RE_SCRIPT_STYLE.sub('', text)
+
+        # Replace common block elements with newlines
+        text = _RE_LINE_BREAK.sub('\n', text)
+
+        # Remove all remaining HTML tags
+        text = _RE_TAG.sub('', text)
+
+    # Decode HTML entities
+    if '&' in text:
+        text = _unescape(text)
+
+    # Clean up whitespace
+    # Replace multiple spaces with single space
+    if '  ' in text:
+        text = _RE_SPACES.sub(' ', text)
+    # Strip each line and collapse runs of blank lines into one blank line
+    lines = []
+    previous_blank = False
+    for line in text.split('\n'):
+        line = line.strip()
+        if line:
+            lines.append(line)
+            previous_blank = False
+        elif not previous_blank:
+            lines.append(line)
+            previous_blank = True
+    # Remove leading/trailing whitespace from entire text
+    text = '\n'.join(lines).strip()
+
+    return text
@@ -0,0 +1,25 @@
+"""Pooled HTTP session shared by the API connectors."""
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Handlers run concurrent fetches through one client, so the pool is sized well above
+# requests' default of 10 connections per host
+POOL_CONNECTIONS = 20
+POOL_MAXSIZE = 100
+
+
+def pooled_session() -> requests.Session:
+    """
+    Create a requests session with an enlarged HTTPS connection pool.
+    
+    Each connector keeps one at module level so clients recreated on reconnect
+    reuse warm connections. Sessions are not shared between connectors because
+    each sets its own auth headers.
+    
+    Returns:
+        New requests.Session
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE))
+    return session
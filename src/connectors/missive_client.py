@@ -2,10 +2,18 @@
 import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
+import orjson
 import requests
 
 from src import settings
 from src.logging_conf import logger
+from src.connectors.http_session import pooled_session
+
+# Max message IDs per GET /messages/{ids} request
+MESSAGES_PER_REQUEST = 10
+
+# Shared across client instances so handlers recreated per reconnect keep warm connections
+_SESSION = pooled_session()
 
 
 class MissiveClient:
@@ -14,11 +22,13 @@ class MissiveClient:
     def __init__(self):
         self.api_token = settings.MISSIVE_API_TOKEN
         self.base_url = "https://public.missiveapp.com/v1"
-        self.session = requests.Session()
+        self.session = _SESSION
         self.session.headers.update({
             "Authorization": f"Bearer {self.api_token}",
             "Accept": "application/json"
         })
+        # Cleared if the API answers comma-separated message IDs with 400/404
+        self.bulk_messages_supported = True
     
     def get_conversations_updated_since(self, since: datetime) -> List[Dict[str, Any]]:
         """
@@ -200,6 +210,48 @@ class MissiveClient:
             logger.error(f"Error fetching message {message_id}: {e}", exc_info=True)
             return None
     
+    def get_messages(self, message_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get full details for several messages using comma-separated ID requests.
+        
+        If the API rejects a multi-ID request with 400 or 404, bulk fetching is
+        switched off for this client. Other failures only skip that chunk; callers
+        fetch whatever is missing with get_message.
+        
+        Args:
+            message_ids: Message IDs
+        
+        Returns:
+            Dict of message ID to full message dict (IDs not returned are omitted)
+        """
+        found = {}
+        for start in range(0, len(message_ids), MESSAGES_PER_REQUEST):
+            chunk = message_ids[start:start + MESSAGES_PER_REQUEST]
+            try:
+                response = self._request("GET", f"/messages/{','.join(chunk)}", raise_http_errors=True)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status in (400, 404) and len(chunk) > 1:
+                    logger.warning("Bulk message fetch not supported (HTTP %s), falling back to single fetches", status)
+                    self.bulk_messages_supported = False
+                    break
+                logger.error(f"Error fetching messages {chunk}: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"Error fetching messages {chunk}: {e}", exc_info=True)
+                continue
+            
+            if not response or "messages" not in response:
+                continue
+            
+            messages = response["messages"]
+            if isinstance(messages, dict):
+                messages = [messages]
+            for message in messages:
+                if isinstance(message, dict) and message.get("id"):
+                    found[str(message["id"])] = message
+        return found
+    
     def download_attachment(self, attachment_url: str) -> Optional[bytes]:
         """
         Download an attachment from Missive.
@@ -224,7 +276,8 @@ class MissiveClient:
         endpoint: str,
         params: Optional[Dict[str, Any]] = None,
         json_data: Optional[Dict[str, Any]] = None,
-        retry_count: int = 0
+        retry_count: int = 0,
+        raise_http_errors: bool = False
     ) -> Optional[Dict[str, Any]]:
         """
         Make an API request with retry logic.
@@ -235,6 +288,7 @@ class MissiveClient:
             params: Query parameters
             json_data: JSON body
             retry_count: Current retry attempt
+            raise_http_errors: Re-raise HTTP error responses instead of returning None
         
         Returns:
             Response JSON or None
@@ -255,19 +309,21 @@ class MissiveClient:
                 retry_after = int(response.headers.get("Retry-After", 60))
                 logger.warning(f"Rate limited by Missive API. Waiting {retry_after}s...")
                 time.sleep(retry_after)
-                return self._request(method, endpoint, params, json_data, retry_count)
+                return self._request(method, endpoint, params, json_data, retry_count, raise_http_errors)
             
             # Handle server errors with exponential backoff
             if response.status_code >= 500 and retry_count < 3:
                 wait_time = 2 ** retry_count
                 logger.warning(f"Server error {response.status_code}. Retrying in {wait_time}s...")
                 time.sleep(wait_time)
-                return self._request(method, endpoint, params, json_data, retry_count + 1)
+                return self._request(method, endpoint, params, json_data, retry_count + 1, raise_http_errors)
             
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
         
         except requests.exceptions.RequestException as e:
+            if raise_http_errors and isinstance(e, requests.exceptions.HTTPError):
+                raise
             logger.error(f"Missive API request failed: {e}", exc_info=True)
             
             # Retry on connection errors
@@ -275,7 +331,11 @@ class MissiveClient:
                 wait_time = 2 ** retry_count
                 logger.info(f"Retrying in {wait_time}s...")
                 time.sleep(wait_time)
-                return self._request(method, endpoint, params, json_data, retry_count + 1)
+                return self._request(method, endpoint, params, json_data, retry_count + 1, raise_http_errors)
             
             return None
+        
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Missive API returned invalid JSON for {url}: {e}")
+            return None
 
@@ -2,11 +2,16 @@
 import time
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
+import orjson
 import requests
 from requests.auth import HTTPBasicAuth
 
 from src import settings
 from src.logging_conf import logger
+from src.connectors.http_session import pooled_session
+
+# One pooled session per process, shared by every TeamworkClient instance
+_SESSION = pooled_session()
 
 
 class TeamworkClient:
@@ -16,8 +21,10 @@ class TeamworkClient:
         self.base_url = settings.TEAMWORK_BASE_URL
         self.api_key = settings.TEAMWORK_API_KEY
         self.auth = HTTPBasicAuth(self.api_key, "")
-        self.session = requests.Session()
+        self.session = _SESSION
         self.session.auth = self.auth
+        # Teamwork web UI typically routes via /#/tasks/{id}
+        self._task_url_prefix = f"{self.base_url}/#/tasks/"
     
     def get_tasks_updated_since(self, since: datetime, include_completed: bool = True) -> List[Dict[str, Any]]:
         """
@@ -253,9 +260,7 @@ class TeamworkClient:
 
     def build_task_web_url(self, task_id: str) -> str:
         """Best-effort construction of a human web URL to the task."""
-        base = settings.TEAMWORK_BASE_URL.rstrip("/")
-        # Teamwork web UI typically routes via /#/tasks/{id}
-        return f"{base}/#/tasks/{task_id}"
+        return self._task_url_prefix + str(task_id)
     
     def _request(
         self,
@@ -315,7 +320,7 @@ class TeamworkClient:
                     f"Teamwork API error {response.status_code} for {url}: {body_preview[:2000]}"
                 )
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
         
         except requests.exceptions.RequestException as e:
             logger.error(f"Teamwork API request failed: {e}", exc_info=True)
@@ -328,4 +333,8 @@ class TeamworkClient:
                 return self._request(method, endpoint, params, json_data, retry_count + 1)
             
             return None
+        
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Teamwork API returned invalid JSON for {url}: {e}")
+            return None
 
@@ -41,11 +41,21 @@ class DatabaseInterface(ABC):
         """Mark an email as deleted."""
         pass
     
+    @abstractmethod
+    def mark_emails_deleted(self, email_ids: List[str]) -> None:
+        """Mark multiple emails as deleted in a single operation."""
+        pass
+    
     @abstractmethod
     def mark_task_deleted(self, task_id: str) -> None:
         """Mark a task as deleted."""
         pass
     
+    @abstractmethod
+    def mark_tasks_deleted(self, task_ids: List[str]) -> None:
+        """Mark multiple tasks as deleted in a single operation."""
+        pass
+    
     @abstractmethod
     def get_checkpoint(self, source: str) -> Optional[Checkpoint]:
         """Get the last sync checkpoint for a source."""
@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import List, Optional, Dict, Any
 
 
-@dataclass
+@dataclass(slots=True)
 class Attachment:
     """Represents an email attachment."""
     filename: str
@@ -25,7 +25,7 @@ class Attachment:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Email:
     """Represents an email message."""
     email_id: str
@@ -78,7 +78,7 @@ class Email:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     """Represents a Teamwork task."""
     task_id: str
@@ -1,9 +1,11 @@
 """PostgreSQL connection management with automatic reconnection and resilience."""
+import sys
 import time
 import functools
 from datetime import datetime
-from typing import Optional, Any, Callable, TypeVar
+from typing import Optional, Any, Callable, Iterable, Set, TypeVar
 from contextlib import contextmanager
+import orjson
 import psycopg2
 from psycopg2 import OperationalError, InterfaceError
 
@@ -12,6 +14,14 @@ from src.logging_conf import logger
 
 T = TypeVar('T')
 
+# datetime.fromisoformat accepts a trailing "Z" from Python 3.11 on
+_ISO_ACCEPTS_Z = sys.version_info >= (3, 11)
+
+
+def json_dumps(value: Any) -> str:
+    """Serialize a value for a JSONB parameter (orjson; use as psycopg2 Json(..., dumps=json_dumps))."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
 
 def is_connection_error(exc: Exception) -> bool:
     """Check if an exception indicates a connection problem that warrants reconnection."""
@@ -265,7 +275,7 @@ class PostgresConnection:
         if not value:
             return None
         try:
-            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return datetime.fromisoformat(value if _ISO_ACCEPTS_Z else value.replace("Z", "+00:00"))
         except Exception:
             return None
     
@@ -275,12 +285,11 @@ class PostgresConnection:
             return None
         try:
             # Try to parse as full datetime first
-            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            dt = datetime.fromisoformat(value if _ISO_ACCEPTS_Z else value.replace("Z", "+00:00"))
             return dt.date()
         except Exception:
             try:
                 # Try to parse as date only
-                from datetime import date
                 return datetime.strptime(value, "%Y-%m-%d").date()
             except Exception:
                 return None
@@ -322,6 +331,27 @@ class PostgresConnection:
             logger.error(f"Error validating foreign key {fk_id} in {table}: {e}")
             return None
     
+    def _existing_fk_ids(self, table: str, fk_ids: Iterable[Optional[int]]) -> Set[int]:
+        """Return which of the given foreign key IDs exist in the referenced table (one query).
+        Missing IDs are logged like in _validate_fk_exists."""
+        wanted = {fk_id for fk_id in fk_ids if fk_id is not None}
+        if not wanted:
+            return set()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(f"SELECT id FROM {table} WHERE id = ANY(%s)", (list(wanted),))
+                existing = {row[0] for row in cur.fetchall()}
+        except Exception as e:
+            try:
+                self._conn.rollback()
+            except Exception:
+                pass
+            logger.error(f"Error validating foreign keys in {table}: {e}")
+            return set()
+        for fk_id in wanted - existing:
+            logger.warning(f"Foreign key {fk_id} not found in {table}, setting to NULL")
+        return existing
+    
     def _get_or_create_contact(self, email: Optional[str], name: Optional[str] = None) -> Optional[int]:
         """Get or create a contact by email. Returns contact_id."""
         if not email:
@@ -1,6 +1,6 @@
 """PostgreSQL operations for Craft documents."""
 from typing import Dict, Any, List, Optional
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_batch
 
 from src.logging_conf import logger
 
@@ -8,7 +8,7 @@ from src.logging_conf import logger
 class PostgresCraftOps:
     """Craft document database operations."""
     
-    def upsert_craft_document(self, doc_data: Dict[str, Any]) -> None:
+    def upsert_craft_document(self, doc_data: Dict[str, Any]) -> bool:
         """
         Upsert a Craft document.
         
@@ -24,12 +24,15 @@ class PostgresCraftOps:
                 - daily_note_date: Date for daily notes (optional)
                 - lastModifiedAt: Last modification timestamp (optional)
                 - createdAt: Creation timestamp (optional)
+        
+        Returns:
+            False if the write failed
         """
         try:
             doc_id = doc_data.get("id")
             if not doc_id:
                 logger.warning("Craft document missing ID, skipping")
-                return
+                return True
             
             with self.conn.cursor() as cur:
                 cur.execute("""
@@ -67,66 +70,76 @@ class PostgresCraftOps:
                 ))
                 self.conn.commit()
                 logger.debug(f"Upserted Craft document {doc_id}")
+            return True
         except Exception as e:
             self.conn.rollback()
             logger.error(f"Failed to upsert Craft document: {e}", exc_info=True)
+            return False
     
-    def upsert_craft_documents_batch(self, documents: List[Dict[str, Any]]) -> None:
+    def upsert_craft_documents_batch(self, documents: List[Dict[str, Any]]) -> bool:
         """
         Upsert multiple Craft documents in a batch.
         
         Args:
             documents: List of document data dicts
+        
+        Returns:
+            False if the write failed (no document of the batch was written)
         """
         if not documents:
-            return
+            return True
+        
+        rows = [
+            (
+                doc_data.get("id"),
+                doc_data.get("title"),
+                doc_data.get("markdown_content"),
+                doc_data.get("isDeleted", False),
+                doc_data.get("folder_path"),
+                doc_data.get("folder_id"),
+                doc_data.get("location"),
+                doc_data.get("daily_note_date"),
+                self._parse_dt(doc_data.get("createdAt")),
+                self._parse_dt(doc_data.get("lastModifiedAt")),
+                Json(doc_data)
+            )
+            for doc_data in documents
+            if doc_data.get("id")
+        ]
+        if not rows:
+            return True
         
         try:
             with self.conn.cursor() as cur:
-                for doc_data in documents:
-                    doc_id = doc_data.get("id")
-                    if not doc_id:
-                        continue
-                    
-                    cur.execute("""
-                        INSERT INTO craft_documents (
-                            id, title, markdown_content, is_deleted,
-                            folder_path, folder_id, location, daily_note_date,
-                            craft_created_at, craft_last_modified_at, raw_data
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        )
-                        ON CONFLICT (id) DO UPDATE SET
-                            title = EXCLUDED.title,
-                            markdown_content = EXCLUDED.markdown_content,
-                            is_deleted = EXCLUDED.is_deleted,
-                            folder_path = EXCLUDED.folder_path,
-                            folder_id = EXCLUDED.folder_id,
-                            location = EXCLUDED.location,
-                            daily_note_date = EXCLUDED.daily_note_date,
-                            craft_created_at = COALESCE(EXCLUDED.craft_created_at, craft_documents.craft_created_at),
-                            craft_last_modified_at = EXCLUDED.craft_last_modified_at,
-                            raw_data = EXCLUDED.raw_data,
-                            db_updated_at = NOW()
-                    """, (
-                        doc_id,
-                        doc_data.get("title"),
-                        doc_data.get("markdown_content"),
-                        doc_data.get("isDeleted", False),
-                        doc_data.get("folder_path"),
-                        doc_data.get("folder_id"),
-                        doc_data.get("location"),
-                        doc_data.get("daily_note_date"),
-                        self._parse_dt(doc_data.get("createdAt")),
-                        self._parse_dt(doc_data.get("lastModifiedAt")),
-                        Json(doc_data)
-                    ))
+                execute_batch(cur, """
+                    INSERT INTO craft_documents (
+                        id, title, markdown_content, is_deleted,
+                        folder_path, folder_id, location, daily_note_date,
+                        craft_created_at, craft_last_modified_at, raw_data
+                    ) VALUES (
+                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                    )
+                    ON CONFLICT (id) DO UPDATE SET
+                        title = EXCLUDED.title,
+                        markdown_content = EXCLUDED.markdown_content,
+                        is_deleted = EXCLUDED.is_deleted,
+                        folder_path = EXCLUDED.folder_path,
+                        folder_id = EXCLUDED.folder_id,
+                        location = EXCLUDED.location,
+                        daily_note_date = EXCLUDED.daily_note_date,
+                        craft_created_at = COALESCE(EXCLUDED.craft_created_at, craft_documents.craft_created_at),
+                        craft_last_modified_at = EXCLUDED.craft_last_modified_at,
+                        raw_data = EXCLUDED.raw_data,
+                        db_updated_at = NOW()
+                """, rows)
                 
                 self.conn.commit()
-                logger.info(f"Batch upserted {len(documents)} Craft documents")
+                logger.info(f"Batch upserted {len(rows)} Craft documents")
+            return True
         except Exception as e:
             self.conn.rollback()
             logger.error(f"Failed to batch upsert Craft documents: {e}", exc_info=True)
+            return False
     
     def mark_craft_document_deleted(self, doc_id: str) -> None:
         """
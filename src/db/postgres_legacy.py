@@ -1,9 +1,10 @@
 """PostgreSQL operations for legacy email/task tables and checkpoints."""
 from typing import List, Optional
-from psycopg2.extras import Json, execute_batch
+from psycopg2.extras import Json, execute_values
 from psycopg2.extras import RealDictCursor
 
 from src.db.models import Email, Task, Checkpoint
+from src.db.postgres_connection import json_dumps
 from src.logging_conf import logger
 
 
@@ -38,6 +39,9 @@ class PostgresLegacyOps:
         if not tasks:
             return
         
+        # One multi-row ON CONFLICT statement cannot touch the same row twice; keep the last task per ID
+        tasks = list({task.task_id: task for task in tasks}.values())
+        
         try:
             with self.conn.cursor() as cur:
                 # Collect all parent task IDs to validate in a single query
@@ -103,20 +107,18 @@ class PostgresLegacyOps:
                         self._parse_dt(raw.get("updatedAt")),
                         updated_by_id,
                         self._parse_dt(raw.get("deletedAt")),
-                        Json(task.source_links),
-                        Json(raw)
+                        Json(task.source_links, dumps=json_dumps),
+                        Json(raw, dumps=json_dumps)
                     ))
                 
-                # Batch upsert tasks
-                execute_batch(cur, """
+                # Batch upsert tasks in a single multi-row statement
+                execute_values(cur, """
                     INSERT INTO teamwork.tasks (
                         id, project_id, tasklist_id, name, description, status, priority, progress,
                         parent_task, start_date, due_date, estimate_minutes, accumulated_estimated_minutes,
                         created_at, created_by_id, updated_at, updated_by_id,
                         deleted_at, source_links, raw_data
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
+                    ) VALUES %s
                     ON CONFLICT (id) DO UPDATE SET
                         project_id = EXCLUDED.project_id,
                         tasklist_id = EXCLUDED.tasklist_id,
@@ -136,7 +138,7 @@ class PostgresLegacyOps:
                         source_links = EXCLUDED.source_links,
                         raw_data = EXCLUDED.raw_data,
                         db_updated_at = NOW()
-                """, task_data)
+                """, task_data, page_size=len(task_data))
                 
                 self.conn.commit()
                 logger.info(f"Batch upserted {len(tasks)} tasks in PostgreSQL")
@@ -157,6 +159,15 @@ class PostgresLegacyOps:
         """
         logger.debug(f"Legacy mark_email_deleted called for {email_id} (no-op - using relational structure)")
     
+    def mark_emails_deleted(self, email_ids: List[str]) -> None:
+        """
+        Mark multiple emails as deleted.
+        
+        DEPRECATED: Legacy emails table has been removed (see mark_email_deleted).
+        This method is kept as a no-op for backward compatibility.
+        """
+        logger.debug(f"Legacy mark_emails_deleted called for {len(email_ids)} emails (no-op - using relational structure)")
+    
     def mark_task_deleted(self, task_id: str) -> None:
         """Mark a task as deleted."""
         try:
@@ -176,6 +187,27 @@ class PostgresLegacyOps:
             logger.error(f"Failed to mark task {task_id} as deleted: {e}", exc_info=True)
             raise
     
+    def mark_tasks_deleted(self, task_ids: List[str]) -> None:
+        """Mark multiple tasks as deleted in a single statement."""
+        if not task_ids:
+            return
+        
+        try:
+            task_ids_int = [int(task_id) for task_id in task_ids]
+            
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE teamwork.tasks
+                    SET deleted_at = NOW(), db_updated_at = NOW()
+                    WHERE id = ANY(%s)
+                """, (task_ids_int,))
+                self.conn.commit()
+                logger.info(f"Marked {len(task_ids)} tasks as deleted")
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Failed to mark {len(task_ids)} tasks as deleted: {e}", exc_info=True)
+            raise
+    
     def get_checkpoint(self, source: str) -> Optional[Checkpoint]:
         """Get the last sync checkpoint for a source."""
         try:
@@ -1,46 +1,14 @@
 """PostgreSQL operations for Missive entities."""
-import re
-from html import unescape
-from typing import Dict, Any, Optional
+from typing import Dict, Any
 from psycopg2.extras import Json
 
+from src.connectors.html_text import html_to_text
 from src.logging_conf import logger
 
 
 class PostgresMissiveOps:
     """Missive entity operations."""
     
-    def _html_to_text(self, html: Optional[str]) -> Optional[str]:
-        """Convert HTML to plain text."""
-        if not html:
-            return None
-        
-        # Remove script and style elements
-        text = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
-        
-        # Replace common block elements with newlines
-        text = re.sub(r'</(div|p|br|tr|h[1-6]|li)>', '\n', text, flags=re.IGNORECASE)
-        text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
-        
-        # Remove all remaining HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # Decode HTML entities
-        text = unescape(text)
-        
-        # Clean up whitespace
-        # Replace multiple spaces with single space
-        text = re.sub(r' +', ' ', text)
-        # Replace multiple newlines with double newline
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
-        # Remove leading/trailing whitespace from each line
-        text = '\n'.join(line.strip() for line in text.split('\n'))
-        # Remove leading/trailing whitespace from entire text
-        text = text.strip()
-        
-        return text if text else None
-    
     def upsert_m_user(self, user_data: Dict[str, Any]) -> None:
         """Upsert a Missive user."""
         try:
@@ -339,7 +307,7 @@ class PostgresMissiveOps:
             
             # Extract body HTML and convert to plain text
             body_html = message_data.get("body")
-            body_plain_text = self._html_to_text(body_html)
+            body_plain_text = html_to_text(body_html) or None
             
             with self.conn.cursor() as cur:
                 # Upsert message
@@ -1,6 +1,6 @@
 """PostgreSQL operations for Teamwork entities."""
-from typing import Dict, Any, List
-from psycopg2.extras import Json
+from typing import Callable, Dict, Any, List
+from psycopg2.extras import Json, execute_values
 
 from src.logging_conf import logger
 
@@ -8,22 +8,51 @@ from src.logging_conf import logger
 class PostgresTeamworkOps:
     """Teamwork entity operations."""
     
-    def upsert_tw_company(self, company_data: Dict[str, Any]) -> None:
-        """Upsert a Teamwork company."""
+    def upsert_tw_companies_batch(self, companies: List[Dict[str, Any]]) -> bool:
+        """Upsert several Teamwork companies in one statement. Returns False if the write failed."""
         try:
-            company_id = int(company_data.get("id"))
+            rows = [
+                (
+                    int(company_data["id"]),
+                    company_data.get("name"),
+                    company_data.get("addressOne"),
+                    company_data.get("addressTwo"),
+                    company_data.get("city"),
+                    company_data.get("state"),
+                    company_data.get("zip"),
+                    company_data.get("countryCode"),
+                    company_data.get("phone"),
+                    company_data.get("fax"),
+                    company_data.get("emailOne"),
+                    company_data.get("emailTwo"),
+                    company_data.get("emailThree"),
+                    company_data.get("website"),
+                    int(company_data["industryId"]) if company_data.get("industryId") else None,
+                    company_data.get("logoUrl"),
+                    company_data.get("canSeePrivate"),
+                    company_data.get("isOwner"),
+                    company_data.get("status"),
+                    company_data.get("privateNotes"),
+                    company_data.get("privateNotesText"),
+                    company_data.get("profileText"),
+                    self._parse_dt(company_data.get("createdAt")),
+                    self._parse_dt(company_data.get("updatedAt")),
+                    Json(company_data)
+                )
+                for company_data in companies
+                if company_data.get("id")
+            ]
+            if not rows:
+                return True
             
             with self.conn.cursor() as cur:
-                cur.execute("""
+                execute_values(cur, """
                     INSERT INTO teamwork.companies (
                         id, name, address_one, address_two, city, state, zip, country_code,
                         phone, fax, email_one, email_two, email_three, website, industry_id,
                         logo_url, can_see_private, is_owner, status, private_notes,
                         private_notes_text, profile_text, created_at, updated_at, raw_data
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
+                    ) VALUES %s
                     ON CONFLICT (id) DO UPDATE SET
                         name = EXCLUDED.name,
                         address_one = EXCLUDED.address_one,
@@ -49,67 +78,78 @@ class PostgresTeamworkOps:
                         updated_at = EXCLUDED.updated_at,
                         raw_data = EXCLUDED.raw_data,
                         db_updated_at = NOW()
-                """, (
-                    company_id,
-                    company_data.get("name"),
-                    company_data.get("addressOne"),
-                    company_data.get("addressTwo"),
-                    company_data.get("city"),
-                    company_data.get("state"),
-                    company_data.get("zip"),
-                    company_data.get("countryCode"),
-                    company_data.get("phone"),
-                    company_data.get("fax"),
-                    company_data.get("emailOne"),
-                    company_data.get("emailTwo"),
-                    company_data.get("emailThree"),
-                    company_data.get("website"),
-                    int(company_data["industryId"]) if company_data.get("industryId") else None,
-                    company_data.get("logoUrl"),
-                    company_data.get("canSeePrivate"),
-                    company_data.get("isOwner"),
-                    company_data.get("status"),
-                    company_data.get("privateNotes"),
-                    company_data.get("privateNotesText"),
-                    company_data.get("profileText"),
-                    self._parse_dt(company_data.get("createdAt")),
-                    self._parse_dt(company_data.get("updatedAt")),
-                    Json(company_data)
-                ))
+                """, rows)
                 self.conn.commit()
-                logger.debug(f"Upserted company {company_id}")
+                logger.debug(f"Upserted {len(rows)} companies")
+                return True
         except Exception as e:
             self.conn.rollback()
-            logger.error(f"Failed to upsert company: {e}", exc_info=True)
+            logger.error(f"Failed to upsert companies: {e}", exc_info=True)
+            return False
     
-    def upsert_tw_user(self, user_data: Dict[str, Any]) -> None:
-        """Upsert a Teamwork user."""
+    def upsert_tw_users_batch(self, users: List[Dict[str, Any]]) -> bool:
+        """Upsert several Teamwork users in one statement. Returns False if the write failed."""
         try:
-            user_id = int(user_data.get("id"))
+            users_with_company = []
+            for user_data in users:
+                if not user_data.get("id"):
+                    continue
+                
+                # Extract company ID from nested object
+                company_id = None
+                if user_data.get("company"):
+                    if isinstance(user_data["company"], dict):
+                        company_id = int(user_data["company"]["id"]) if user_data["company"].get("id") else None
+                elif user_data.get("companyId"):
+                    company_id = int(user_data["companyId"])
+                users_with_company.append((user_data, company_id))
+            if not users_with_company:
+                return True
             
-            # Extract company ID from nested object
-            company_id = None
-            if user_data.get("company"):
-                if isinstance(user_data["company"], dict):
-                    company_id = int(user_data["company"]["id"]) if user_data["company"].get("id") else None
-            elif user_data.get("companyId"):
-                company_id = int(user_data["companyId"])
+            # Validate that companies exist before setting foreign keys
+            valid_company_ids = self._existing_fk_ids(
+                "teamwork.companies", (company_id for _, company_id in users_with_company)
+            )
             
-            # Validate that company exists before setting foreign key
-            company_id = self._validate_fk_exists("teamwork.companies", company_id)
+            rows = [
+                (
+                    int(user_data["id"]),
+                    user_data.get("firstName"),
+                    user_data.get("lastName"),
+                    user_data.get("email"),
+                    user_data.get("avatarUrl"),
+                    user_data.get("title"),
+                    company_id if company_id in valid_company_ids else None,
+                    int(user_data["companyRoleId"]) if user_data.get("companyRoleId") else None,
+                    user_data.get("isAdmin"),
+                    user_data.get("isClientUser"),
+                    user_data.get("isPlaceholderResource"),
+                    user_data.get("isServiceAccount"),
+                    user_data.get("deleted", False),
+                    user_data.get("canAddProjects"),
+                    user_data.get("canAccessPortfolio"),
+                    user_data.get("canManagePortfolio"),
+                    user_data.get("timezone"),
+                    user_data.get("lengthOfDay"),
+                    user_data.get("userCost"),
+                    user_data.get("userRate"),
+                    self._parse_dt(user_data.get("lastLogin")),
+                    self._parse_dt(user_data.get("createdAt")),
+                    self._parse_dt(user_data.get("updatedAt")),
+                    Json(user_data)
+                )
+                for user_data, company_id in users_with_company
+            ]
             
             with self.conn.cursor() as cur:
-                cur.execute("""
+                execute_values(cur, """
                     INSERT INTO teamwork.users (
                         id, first_name, last_name, email, avatar_url, title, company_id,
                         company_role_id, is_admin, is_client_user, is_placeholder_resource,
                         is_service_account, deleted, can_add_projects, can_access_portfolio,
                         can_manage_portfolio, timezone, length_of_day, user_cost, user_rate,
                         last_login, created_at, updated_at, raw_data
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s, %s, %s, %s, %s
-                    )
+                    ) VALUES %s
                     ON CONFLICT (id) DO UPDATE SET
                         first_name = EXCLUDED.first_name,
                         last_name = EXCLUDED.last_name,
@@ -134,49 +174,42 @@ class PostgresTeamworkOps:
                         updated_at = EXCLUDED.updated_at,
                         raw_data = EXCLUDED.raw_data,
                         db_updated_at = NOW()
-                """, (
-                    user_id,
-                    user_data.get("firstName"),
-                    user_data.get("lastName"),
-                    user_data.get("email"),
-                    user_data.get("avatarUrl"),
-                    user_data.get("title"),
-                    company_id,
-                    int(user_data["companyRoleId"]) if user_data.get("companyRoleId") else None,
-                    user_data.get("isAdmin"),
-                    user_data.get("isClientUser"),
-                    user_data.get("isPlaceholderResource"),
-                    user_data.get("isServiceAccount"),
-                    user_data.get("deleted", False),
-                    user_data.get("canAddProjects"),
-                    user_data.get("canAccessPortfolio"),
-                    user_data.get("canManagePortfolio"),
-                    user_data.get("timezone"),
-                    user_data.get("lengthOfDay"),
-                    user_data.get("userCost"),
-                    user_data.get("userRate"),
-                    self._parse_dt(user_data.get("lastLogin")),
-                    self._parse_dt(user_data.get("createdAt")),
-                    self._parse_dt(user_data.get("updatedAt")),
-                    Json(user_data)
-                ))
+                """, rows)
                 self.conn.commit()
-                logger.debug(f"Upserted user {user_id}")
+                logger.debug(f"Upserted {len(rows)} users")
+                return True
         except Exception as e:
             self.conn.rollback()
-            logger.error(f"Failed to upsert user: {e}", exc_info=True)
+            logger.error(f"Failed to upsert users: {e}", exc_info=True)
+            return False
     
-    def upsert_tw_team(self, team_data: Dict[str, Any]) -> None:
-        """Upsert a Teamwork team."""
+    def upsert_tw_teams_batch(self, teams: List[Dict[str, Any]]) -> bool:
+        """Upsert several Teamwork teams in one statement. Returns False if the write failed."""
         try:
-            team_id = int(team_data.get("id"))
+            rows = [
+                (
+                    int(team_data["id"]),
+                    team_data.get("name"),
+                    team_data.get("handle"),
+                    team_data.get("teamLogo"),
+                    team_data.get("teamLogoColor"),
+                    team_data.get("teamLogoIcon"),
+                    self._parse_dt(team_data.get("createdAt")),
+                    self._parse_dt(team_data.get("updatedAt")),
+                    Json(team_data)
+                )
+                for team_data in teams
+                if team_data.get("id")
+            ]
+            if not rows:
+                return True
             
             with self.conn.cursor() as cur:
-                cur.execute("""
+                execute_values(cur, """
                     INSERT INTO teamwork.teams (
                         id, name, handle, team_logo, team_logo_color, team_logo_icon,
                         created_at, updated_at, raw_data
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ) VALUES %s
                     ON CONFLICT (id) DO UPDATE SET
                         name = EXCLUDED.name,
                         handle = EXCLUDED.handle,
@@ -186,41 +219,47 @@ class PostgresTeamworkOps:
                         updated_at = EXCLUDED.updated_at,
                         raw_data = EXCLUDED.raw_data,
                         db_updated_at = NOW()
-                """, (
-                    team_id,
-                    team_data.get("name"),
-                    team_data.get("handle"),
-                    team_data.get("teamLogo"),
-                    team_data.get("teamLogoColor"),
-                    team_data.get("teamLogoIcon"),
-                    self._parse_dt(team_data.get("createdAt")),
-                    self._parse_dt(team_data.get("updatedAt")),
-                    Json(team_data)
-                ))
+                """, rows)
                 self.conn.commit()
-                logger.debug(f"Upserted team {team_id}")
+                logger.debug(f"Upserted {len(rows)} teams")
+                return True
         except Exception as e:
             self.conn.rollback()
-            logger.error(f"Failed to upsert team: {e}", exc_info=True)
+            logger.error(f"Failed to upsert teams: {e}", exc_info=True)
+            return False
     
-    def upsert_tw_tag(self, tag_data: Dict[str, Any]) -> None:
-        """Upsert a Teamwork tag."""
+    def upsert_tw_tags_batch(self, tags: List[Dict[str, Any]]) -> bool:
+        """Upsert several Teamwork tags in one statement. Returns False if the write failed."""
         try:
-            tag_id = int(tag_data.get("id"))
-            
-            # Extract project ID from nested object
-            project_id = None
-            if tag_data.get("project"):
-                if isinstance(tag_data["project"], dict):
-                    project_id = int(tag_data["project"]["id"]) if tag_data["project"].get("id") else None
-            elif tag_data.get("projectId"):
-                project_id = int(tag_data["projectId"])
+            rows = []
+            for tag_data in tags:
+                if not tag_data.get("id"):
+                    continue
+                
+                # Extract project ID from nested object
+                project_id = None
+                if tag_data.get("project"):
+                    if isinstance(tag_data["project"], dict):
+                        project_id = int(tag_data["project"]["id"]) if tag_data["project"].get("id") else None
+                elif tag_data.get("projectId"):
+                    project_id = int(tag_data["projectId"])
+                
+                rows.append((
+                    int(tag_data["id"]),
+                    tag_data.get("name"),
+                    tag_data.get("color"),
+                    project_id,
+                    tag_data.get("count", 0),
+                    Json(tag_data)
+                ))
+            if not rows:
+                return True
             
             with self.conn.cursor() as cur:
-                cur.execute("""
+                execute_values(cur, """
                     INSERT INTO teamwork.tags (
                         id, name, color, project_id, count, raw_data
-                    ) VALUES (%s, %s, %s, %s, %s, %s)
+                    ) VALUES %s
                     ON CONFLICT (id) DO UPDATE SET
                         name = EXCLUDED.name,
                         color = EXCLUDED.color,
@@ -228,39 +267,79 @@ class PostgresTeamworkOps:
                         count = EXCLUDED.count,
                         raw_data = EXCLUDED.raw_data,
                         db_updated_at = NOW()
-                """, (
-                    tag_id,
-                    tag_data.get("name"),
-                    tag_data.get("color"),
-                    project_id,
-                    tag_data.get("count", 0),
-                    Json(tag_data)
-                ))
+                """, rows)
                 self.conn.commit()
-                logger.debug(f"Upserted tag {tag_id}")
+                logger.debug(f"Upserted {len(rows)} tags")
+                return True
         except Exception as e:
             self.conn.rollback()
-            logger.error(f"Failed to upsert tag: {e}", exc_info=True)
+            logger.error(f"Failed to upsert tags: {e}", exc_info=True)
+            return False
     
-    def upsert_tw_project(self, project_data: Dict[str, Any]) -> None:
-        """Upsert a Teamwork project."""
+    def upsert_tw_projects_batch(self, projects: List[Dict[str, Any]]) -> bool:
+        """Upsert several Teamwork projects in one statement. Returns False if the write failed."""
         try:
-            project_id = int(project_data.get("id"))
+            projects = [project_data for project_data in projects if project_data.get("id")]
+            if not projects:
+                return True
             
             # Extract related IDs from nested objects
-            company_id = self._extract_id(project_data.get("company") or project_data.get("companyId"))
-            owner_id = self._extract_id(project_data.get("ownedBy") or project_data.get("ownerId"))
-            category_id = self._extract_id(project_data.get("category") or project_data.get("categoryId"))
-            completed_by = self._extract_id(project_data.get("completedBy"))
-            created_by = self._extract_id(project_data.get("createdBy"))
-            updated_by = self._extract_id(project_data.get("updatedBy"))
+            company_ids = [
+                self._extract_id(project_data.get("company") or project_data.get("companyId"))
+                for project_data in projects
+            ]
+            owner_ids = [
+                self._extract_id(project_data.get("ownedBy") or project_data.get("ownerId"))
+                for project_data in projects
+            ]
             
             # Validate foreign keys exist
-            company_id = self._validate_fk_exists("teamwork.companies", company_id)
-            owner_id = self._validate_fk_exists("teamwork.users", owner_id)
+            valid_company_ids = self._existing_fk_ids("teamwork.companies", company_ids)
+            valid_owner_ids = self._existing_fk_ids("teamwork.users", owner_ids)
+            
+            rows = [
+                (
+                    int(project_data["id"]),
+                    project_data.get("name"),
+                    project_data.get("description"),
+                    company_id if company_id in valid_company_ids else None,
+                    owner_id if owner_id in valid_owner_ids else None,
+                    self._extract_id(project_data.get("category") or project_data.get("categoryId")),
+                    project_data.get("status"),
+                    project_data.get("subStatus"),
+                    self._parse_date(project_data.get("startDate")),
+                    self._parse_date(project_data.get("endDate")),
+                    self._parse_dt(project_data.get("startAt")),
+                    self._parse_dt(project_data.get("endAt")),
+                    self._parse_dt(project_data.get("completedAt")),
+                    self._extract_id(project_data.get("completedBy")),
+                    self._extract_id(project_data.get("createdBy")),
+                    self._extract_id(project_data.get("updatedBy")),
+                    project_data.get("isStarred"),
+                    project_data.get("isBillable"),
+                    project_data.get("isSampleProject"),
+                    project_data.get("isOnBoardingProject"),
+                    project_data.get("isProjectAdmin"),
+                    project_data.get("logo"),
+                    project_data.get("logoColor"),
+                    project_data.get("logoIcon"),
+                    project_data.get("announcement"),
+                    project_data.get("showAnnouncement"),
+                    project_data.get("defaultPrivacy"),
+                    project_data.get("privacyEnabled"),
+                    project_data.get("harvestTimersEnabled"),
+                    project_data.get("notifyEveryone"),
+                    project_data.get("skipWeekends"),
+                    self._parse_dt(project_data.get("createdAt")),
+                    self._parse_dt(project_data.get("updatedAt")),
+                    self._parse_dt(project_data.get("lastWorkedOn")),
+                    Json(project_data)
+                )
+                for project_data, company_id, owner_id in zip(projects, company_ids, owner_ids)
+            ]
             
             with self.conn.cursor() as cur:
-                cur.execute("""
+                execute_values(cur, """
                     INSERT INTO teamwork.projects (
                         id, name, description, company_id, owner_id, category_id, status, sub_status,
                         start_date, end_date, start_at, end_at, completed_at, completed_by,
@@ -269,10 +348,7 @@ class PostgresTeamworkOps:
                         announcement, show_announcement, default_privacy, privacy_enabled,
                         harvest_timers_enabled, notify_everyone, skip_weekends,
                         created_at, updated_at, last_worked_on, raw_data
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
+                    ) VALUES %s
                     ON CONFLICT (id) DO UPDATE SET
                         name = EXCLUDED.name,
                         description = EXCLUDED.description,
@@ -304,70 +380,59 @@ class PostgresTeamworkOps:
                         last_worked_on = EXCLUDED.last_worked_on,
                         raw_data = EXCLUDED.raw_data,
                         db_updated_at = NOW()
-                """, (
-                    project_id,
-                    project_data.get("name"),
-                    project_data.get("description"),
-                    company_id,
-                    owner_id,
-                    category_id,
-                    project_data.get("status"),
-                    project_data.get("subStatus"),
-                    self._parse_date(project_data.get("startDate")),
-                    self._parse_date(project_data.get("endDate")),
-                    self._parse_dt(project_data.get("startAt")),
-                    self._parse_dt(project_data.get("endAt")),
-                    self._parse_dt(project_data.get("completedAt")),
-                    completed_by,
-                    created_by,
-                    updated_by,
-                    project_data.get("isStarred"),
-                    project_data.get("isBillable"),
-                    project_data.get("isSampleProject"),
-                    project_data.get("isOnBoardingProject"),
-                    project_data.get("isProjectAdmin"),
-                    project_data.get("logo"),
-                    project_data.get("logoColor"),
-                    project_data.get("logoIcon"),
-                    project_data.get("announcement"),
-                    project_data.get("showAnnouncement"),
-                    project_data.get("defaultPrivacy"),
-                    project_data.get("privacyEnabled"),
-                    project_data.get("harvestTimersEnabled"),
-                    project_data.get("notifyEveryone"),
-                    project_data.get("skipWeekends"),
-                    self._parse_dt(project_data.get("createdAt")),
-                    self._parse_dt(project_data.get("updatedAt")),
-                    self._parse_dt(project_data.get("lastWorkedOn")),
-                    Json(project_data)
-                ))
+                """, rows)
                 self.conn.commit()
-                logger.debug(f"Upserted project {project_id}")
+                logger.debug(f"Upserted {len(rows)} projects")
+                return True
         except Exception as e:
             self.conn.rollback()
-            logger.error(f"Failed to upsert project: {e}", exc_info=True)
+            logger.error(f"Failed to upsert projects: {e}", exc_info=True)
+            return False
     
-    def upsert_tw_tasklist(self, tasklist_data: Dict[str, Any]) -> None:
-        """Upsert a Teamwork tasklist."""
+    def upsert_tw_tasklists_batch(self, tasklists: List[Dict[str, Any]]) -> bool:
+        """Upsert several Teamwork tasklists in one statement. Returns False if the write failed."""
         try:
-            tasklist_id = int(tasklist_data.get("id"))
+            tasklists = [tasklist_data for tasklist_data in tasklists if tasklist_data.get("id")]
+            if not tasklists:
+                return True
             
-            # Extract project ID from nested object
-            project_id = self._extract_id(tasklist_data.get("project") or tasklist_data.get("projectId"))
-            milestone_id = self._extract_id(tasklist_data.get("milestone") or tasklist_data.get("milestoneId"))
+            # Extract project ID from nested object and validate it exists
+            project_ids = [
+                self._extract_id(tasklist_data.get("project") or tasklist_data.get("projectId"))
+                for tasklist_data in tasklists
+            ]
+            valid_project_ids = self._existing_fk_ids("teamwork.projects", project_ids)
             
-            # Validate foreign keys exist
-            project_id = self._validate_fk_exists("teamwork.projects", project_id)
+            rows = [
+                (
+                    int(tasklist_data["id"]),
+                    tasklist_data.get("name"),
+                    tasklist_data.get("description"),
+                    project_id if project_id in valid_project_ids else None,
+                    self._extract_id(tasklist_data.get("milestone") or tasklist_data.get("milestoneId")),
+                    tasklist_data.get("status"),
+                    tasklist_data.get("displayOrder"),
+                    tasklist_data.get("isPrivate"),
+                    tasklist_data.get("isPinned"),
+                    tasklist_data.get("isBillable"),
+                    tasklist_data.get("icon"),
+                    int(tasklist_data["lockdownId"]) if tasklist_data.get("lockdownId") else None,
+                    self._parse_date(tasklist_data.get("calculatedStartDate")),
+                    self._parse_date(tasklist_data.get("calculatedDueDate")),
+                    self._parse_dt(tasklist_data.get("createdAt")),
+                    self._parse_dt(tasklist_data.get("updatedAt")),
+                    Json(tasklist_data)
+                )
+                for tasklist_data, project_id in zip(tasklists, project_ids)
+            ]
             
             with self.conn.cursor() as cur:
-                cur.execute("""
+                execute_values(cur, """
                     INSERT INTO teamwork.tasklists (
                         id, name, description, project_id, milestone_id, status, display_order,
                         is_private, is_pinned, is_billable, icon, lockdown_id,
                         calculated_start_date, calculated_due_date, created_at, updated_at, raw_data
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
+                    ) VALUES %s
                     ON CONFLICT (id) DO UPDATE SET
                         name = EXCLUDED.name,
                         description = EXCLUDED.description,
@@ -385,30 +450,14 @@ class PostgresTeamworkOps:
                         updated_at = EXCLUDED.updated_at,
                         raw_data = EXCLUDED.raw_data,
                         db_updated_at = NOW()
-                """, (
-                    tasklist_id,
-                    tasklist_data.get("name"),
-                    tasklist_data.get("description"),
-                    project_id,
-                    milestone_id,
-                    tasklist_data.get("status"),
-                    tasklist_data.get("displayOrder"),
-                    tasklist_data.get("isPrivate"),
-                    tasklist_data.get("isPinned"),
-                    tasklist_data.get("isBillable"),
-                    tasklist_data.get("icon"),
-                    int(tasklist_data["lockdownId"]) if tasklist_data.get("lockdownId") else None,
-                    self._parse_date(tasklist_data.get("calculatedStartDate")),
-                    self._parse_date(tasklist_data.get("calculatedDueDate")),
-                    self._parse_dt(tasklist_data.get("createdAt")),
-                    self._parse_dt(tasklist_data.get("updatedAt")),
-                    Json(tasklist_data)
-                ))
+                """, rows)
                 self.conn.commit()
-                logger.debug(f"Upserted tasklist {tasklist_id}")
+                logger.debug(f"Upserted {len(rows)} tasklists")
+                return True
         except Exception as e:
             self.conn.rollback()
-            logger.error(f"Failed to upsert tasklist: {e}", exc_info=True)
+            logger.error(f"Failed to upsert tasklists: {e}", exc_info=True)
+            return False
     
     def link_task_tags(self, task_id: str, tag_ids: List[int]) -> None:
         """Link a task to tags (many-to-many). Diff-aware: only touches actually changed rows."""
@@ -464,20 +513,99 @@ class PostgresTeamworkOps:
             self.conn.rollback()
             logger.error(f"Failed to link task assignees: {e}", exc_info=True)
     
-    def link_user_teams(self, user_id: int, team_ids: List[int]) -> None:
-        """Link a user to teams (many-to-many)."""
+    def link_task_tags_batch(self, task_tags: Dict[str, List[int]]) -> None:
+        """Link many tasks to their tags in one transaction (diff-aware, like link_task_tags)."""
+        self._link_task_relations_batch("teamwork.task_tags", "tag_id", "teamwork.tags", task_tags, self.link_task_tags)
+    
+    def link_task_assignees_batch(self, task_assignees: Dict[str, List[int]]) -> None:
+        """Link many tasks to their assignees in one transaction (diff-aware, like link_task_assignees)."""
+        self._link_task_relations_batch(
+            "teamwork.task_assignees", "user_id", "teamwork.users", task_assignees, self.link_task_assignees,
+        )
+    
+    def _link_task_relations_batch(
+        self,
+        table: str,
+        column: str,
+        ref_table: str,
+        links: Dict[str, List[int]],
+        link_one: Callable[[str, List[int]], None],
+    ) -> None:
+        """
+        Diff a many-to-many task link table for several tasks with one read, one delete and one insert.
+        
+        Referenced IDs missing from ref_table are dropped up front. If the batch still fails,
+        each task is linked on its own with link_one so one bad task does not lose the others' links.
+        """
+        if not links:
+            return
+        known = self._existing_fk_ids(ref_table, (ref_id for ref_ids in links.values() for ref_id in ref_ids))
+        try:
+            desired = {
+                int(task_id): {ref_id for ref_id in ref_ids if ref_id in known}
+                for task_id, ref_ids in links.items()
+            }
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT task_id, {column} FROM {table} WHERE task_id = ANY(%s)",
+                    (list(desired),),
+                )
+                existing: Dict[int, set] = {}
+                for task_id, ref_id in cur.fetchall():
+                    existing.setdefault(task_id, set()).add(ref_id)
+                
+                to_remove = []
+                to_add = []
+                for task_id, wanted in desired.items():
+                    current = existing.get(task_id, set())
+                    to_remove.extend((task_id, ref_id) for ref_id in current - wanted)
+                    to_add.extend((task_id, ref_id) for ref_id in wanted - current)
+                
+                if to_remove:
+                    execute_values(
+                        cur,
+                        f"DELETE FROM {table} t USING (VALUES %s) AS d(task_id, ref_id) "
+                        f"WHERE t.task_id = d.task_id AND t.{column} = d.ref_id",
+                        to_remove,
+                    )
+                if to_add:
+                    execute_values(
+                        cur,
+                        f"INSERT INTO {table} (task_id, {column}) VALUES %s ON CONFLICT DO NOTHING",
+                        to_add,
+                    )
+                
+                self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Failed to link {table} in batch, linking tasks individually: {e}", exc_info=True)
+            for task_id, ref_ids in links.items():
+                link_one(task_id, ref_ids)
+    
+    def link_user_teams_batch(self, user_teams: Dict[int, List[int]]) -> None:
+        """Replace the team links of several users with one delete and one insert.
+        Team IDs missing from teamwork.teams are skipped so they cannot roll back the other users' links."""
+        if not user_teams:
+            return
+        known = self._existing_fk_ids("teamwork.teams", (team_id for team_ids in user_teams.values() for team_id in team_ids))
         try:
             with self.conn.cursor() as cur:
                 # Clear existing links
-                cur.execute("DELETE FROM teamwork.user_teams WHERE user_id = %s", (user_id,))
+                cur.execute("DELETE FROM teamwork.user_teams WHERE user_id = ANY(%s)", (list(user_teams),))
                 
                 # Insert new links
-                for team_id in team_ids:
-                    cur.execute("""
-                        INSERT INTO teamwork.user_teams (user_id, team_id)
-                        VALUES (%s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, (user_id, team_id))
+                pairs = [
+                    (user_id, team_id)
+                    for user_id, team_ids in user_teams.items()
+                    for team_id in team_ids
+                    if team_id in known
+                ]
+                if pairs:
+                    execute_values(
+                        cur,
+                        "INSERT INTO teamwork.user_teams (user_id, team_id) VALUES %s ON CONFLICT DO NOTHING",
+                        pairs,
+                    )
                 
                 self.conn.commit()
         except Exception as e:
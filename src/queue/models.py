@@ -1,11 +1,11 @@
 """Queue item models."""
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional
-import json
+import orjson
 
 
-@dataclass
+@dataclass(slots=True)
 class QueueItem:
     """Represents an item in the processing queue."""
     source: str  # "teamwork" or "missive"
@@ -15,15 +15,20 @@ class QueueItem:
     enqueued_at: str  # ISO 8601 timestamp
     attempts: int = 0
     last_error: Optional[str] = None
+    # Set by the queue on dequeue (database row ID and retry count)
+    _db_id: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    _retry_count: int = field(default=0, init=False, repr=False, compare=False)
     
     def to_json(self) -> str:
         """Serialize to JSON string."""
-        return json.dumps(asdict(self))
+        data = asdict(self)
+        del data["_db_id"], data["_retry_count"]
+        return orjson.dumps(data).decode()
     
     @classmethod
     def from_json(cls, json_str: str) -> "QueueItem":
         """Deserialize from JSON string."""
-        data = json.loads(json_str)
+        data = orjson.loads(json_str)
         return cls(**data)
     
     @classmethod
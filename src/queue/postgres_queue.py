@@ -1,16 +1,30 @@
 """PostgreSQL-backed queue implementation with connection resilience."""
 import uuid
 import time
-from typing import List, Optional
+import select
+from typing import List, Optional, Tuple
 
-from psycopg2.extras import Json
+import orjson
+from psycopg2.extras import Json, execute_batch
 from psycopg2 import OperationalError, InterfaceError
 
 from src import settings
+from src.db.postgres_connection import json_dumps
 from src.queue.models import QueueItem
 from src.logging_conf import logger
 
 
+# Channel notified on enqueue so idle workers wake up without polling
+QUEUE_NOTIFY_CHANNEL = "teamworkmissiveconnector_queue"
+
+
+def _load_payload(raw: Optional[str]) -> dict:
+    """Decode a payload selected as text; ID-only items carry an empty object."""
+    if not raw or raw == "{}":
+        return {}
+    return orjson.loads(raw) or {}
+
+
 def is_connection_error(exc: Exception) -> bool:
     """Check if an exception indicates a connection problem."""
     if isinstance(exc, (OperationalError, InterfaceError)):
@@ -36,6 +50,7 @@ class PostgresQueue:
         """
         self._db = db
         self.worker_id = str(uuid.uuid4())[:8]
+        self._listen_conn = None  # Connection on which LISTEN was issued
         logger.info(f"PostgreSQL queue initialized with worker_id: {self.worker_id}")
     
     @property
@@ -119,9 +134,10 @@ class PostgresQueue:
                 item.source,
                 item.event_type,
                 item.external_id,
-                Json(item.payload),
+                Json(item.payload, dumps=json_dumps),
                 'pending'
             ))
+            cur.execute("SELECT pg_notify(%s, %s)", (QUEUE_NOTIFY_CHANNEL, item.source))
             logger.debug(f"Enqueued {item.source}/{item.event_type}/{item.external_id}")
             return True
         
@@ -154,9 +170,10 @@ class PostgresQueue:
                     item.source,
                     item.event_type,
                     item.external_id,
-                    Json(item.payload),
+                    Json(item.payload, dumps=json_dumps),
                     'pending'
                 ))
+            cur.execute("SELECT pg_notify(%s, %s)", (QUEUE_NOTIFY_CHANNEL, "batch"))
             logger.info(f"Enqueued batch of {len(items)} items")
             return True
         
@@ -166,20 +183,77 @@ class PostgresQueue:
             logger.error(f"Failed to enqueue batch: {e}", exc_info=True)
             return False
     
-    def dequeue_batch(self, max_items: int = 10, source: Optional[str] = None) -> List[QueueItem]:
+    def dequeue_batch(
+        self,
+        max_items: int = 10,
+        source: Optional[str] = None,
+        wait_timeout: float = 0.0,
+    ) -> List[QueueItem]:
         """
         Dequeue items for processing using database function.
         
         Args:
             max_items: Maximum number of items to dequeue
             source: Optional source filter ('teamwork' or 'missive')
+            wait_timeout: If the queue is empty, wait up to this many seconds for an
+                enqueue notification and try once more (0 returns immediately)
         
         Returns:
             List of queue items ready for processing (empty list on failure)
         """
+        if wait_timeout > 0:
+            self._ensure_listening()
+        
+        items = self._dequeue(max_items, source)
+        if items or wait_timeout <= 0:
+            return items
+        
+        if not self._wait_for_notify(wait_timeout):
+            return []
+        return self._dequeue(max_items, source)
+    
+    def _ensure_listening(self) -> None:
+        """Subscribe to enqueue notifications on the current connection (again after reconnects)."""
+        conn = self.conn
+        if self._listen_conn is conn:
+            return
+        
+        def do_listen(cur):
+            cur.execute(f"LISTEN {QUEUE_NOTIFY_CHANNEL}")
+            return True
+        
+        if self._execute_with_retry("listen", do_listen, fallback_result=False):
+            self._listen_conn = conn
+    
+    def _wait_for_notify(self, timeout: float) -> bool:
+        """
+        Block until an enqueue notification arrives or the timeout expires.
+        
+        Returns:
+            True if a notification was received, False on timeout or error
+        """
+        conn = self._listen_conn
+        if conn is None:
+            time.sleep(timeout)
+            return False
+        try:
+            if not conn.notifies:
+                if select.select([conn], [], [], timeout) == ([], [], []):
+                    return False
+                conn.poll()
+            received = bool(conn.notifies)
+            conn.notifies.clear()
+            return received
+        except Exception as e:
+            logger.warning(f"Waiting for queue notification failed: {e}")
+            self._listen_conn = None
+            return False
+    
+    def _dequeue(self, max_items: int, source: Optional[str]) -> List[QueueItem]:
+        """Claim up to max_items pending items via the dequeue_items database function."""
         def do_dequeue(cur):
             cur.execute("""
-                SELECT id, source, event_type, external_id, payload, retry_count
+                SELECT id, source, event_type, external_id, payload::text, retry_count
                 FROM teamworkmissiveconnector.dequeue_items(%s, %s, %s)
             """, (self.worker_id, max_items, source))
             
@@ -191,7 +265,7 @@ class PostgresQueue:
                     source=row[1],
                     event_type=row[2],
                     external_id=row[3],
-                    payload=row[4] or {}
+                    payload=_load_payload(row[4])
                 )
                 item._db_id = row[0]
                 item._retry_count = row[5]
@@ -228,7 +302,7 @@ class PostgresQueue:
         Returns:
             True if marked successfully, False otherwise
         """
-        if not hasattr(item, '_db_id'):
+        if item._db_id is None:
             logger.warning("Item has no _db_id, cannot mark as completed")
             return False
         
@@ -245,6 +319,34 @@ class PostgresQueue:
             logger.error(f"Failed to mark item as completed: {e}", exc_info=True)
             return False
     
+    def mark_batch_completed(self, items: List[QueueItem], processing_time_ms: Optional[int] = None) -> bool:
+        """
+        Mark multiple items as completed in a single transaction.
+        
+        Args:
+            items: Queue items that were processed successfully
+            processing_time_ms: Optional processing time in milliseconds
+            
+        Returns:
+            True if marked successfully, False otherwise
+        """
+        db_ids = [item._db_id for item in items if item._db_id is not None]
+        if not db_ids:
+            return True
+        
+        def do_mark_batch_completed(cur):
+            execute_batch(cur, """
+                SELECT teamworkmissiveconnector.mark_completed(%s, %s)
+            """, [(db_id, processing_time_ms) for db_id in db_ids])
+            logger.debug(f"Marked {len(db_ids)} items as completed")
+            return True
+        
+        try:
+            return self._execute_with_retry("mark_batch_completed", do_mark_batch_completed, fallback_result=False)
+        except Exception as e:
+            logger.error(f"Failed to mark batch as completed: {e}", exc_info=True)
+            return False
+    
     def mark_batch_failed(self, items: List[QueueItem], error_msg: str) -> None:
         """
         Mark items as failed with retry logic.
@@ -253,8 +355,35 @@ class PostgresQueue:
             items: List of queue items that failed
             error_msg: Error message describing the failure
         """
-        for item in items:
-            self.mark_item_failed(item, error_msg, retry=True)
+        self.mark_batch_failed_with_errors([(item, error_msg) for item in items], retry=True)
+    
+    def mark_batch_failed_with_errors(self, failures: List[Tuple[QueueItem, str]], retry: bool = True) -> bool:
+        """
+        Mark multiple items as failed, each with its own error, in a single transaction.
+        
+        Args:
+            failures: List of (queue item, error message) tuples
+            retry: Whether to retry (with exponential backoff)
+            
+        Returns:
+            True if marked successfully, False otherwise
+        """
+        params = [(item._db_id, error_msg, retry) for item, error_msg in failures if item._db_id is not None]
+        if not params:
+            return True
+        
+        def do_mark_batch_failed(cur):
+            execute_batch(cur, """
+                SELECT teamworkmissiveconnector.mark_failed(%s, %s, %s)
+            """, params)
+            logger.debug(f"Marked {len(params)} items as failed (retry={retry})")
+            return True
+        
+        try:
+            return self._execute_with_retry("mark_batch_failed", do_mark_batch_failed, fallback_result=False)
+        except Exception as e:
+            logger.error(f"Failed to mark batch as failed: {e}", exc_info=True)
+            return False
     
     def mark_item_failed(self, item: QueueItem, error_msg: str, retry: bool = True) -> bool:
         """
@@ -268,7 +397,7 @@ class PostgresQueue:
         Returns:
             True if marked successfully, False otherwise
         """
-        if not hasattr(item, '_db_id'):
+        if item._db_id is None:
             logger.warning(f"Item has no _db_id, cannot mark as failed: {error_msg}")
             return False
         
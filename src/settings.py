@@ -35,6 +35,7 @@ INCLUDE_COMPLETED_TASKS_ON_INITIAL_SYNC = os.getenv("INCLUDE_COMPLETED_TASKS_ON_
 MISSIVE_API_TOKEN = os.getenv("MISSIVE_API_TOKEN")
 MISSIVE_WEBHOOK_SECRET = os.getenv("MISSIVE_WEBHOOK_SECRET", "")
 MISSIVE_PROCESS_AFTER = os.getenv("MISSIVE_PROCESS_AFTER")  # Format: DD.MM.YYYY
+MISSIVE_FETCH_WORKERS = int(os.getenv("MISSIVE_FETCH_WORKERS", "8"))  # Concurrent message fetches per worker process
 
 # Craft settings
 CRAFT_BASE_URL = os.getenv("CRAFT_BASE_URL", "").rstrip("/")
@@ -77,6 +78,11 @@ MAX_QUEUE_ATTEMPTS = int(os.getenv("MAX_QUEUE_ATTEMPTS", "3"))
 BACKFILL_OVERLAP_SECONDS = int(os.getenv("BACKFILL_OVERLAP_SECONDS", "120"))
 
 SPOOL_RETRY_SECONDS = int(os.getenv("SPOOL_RETRY_SECONDS", "60"))
+QUEUE_WAIT_SECONDS = int(os.getenv("QUEUE_WAIT_SECONDS", "5"))  # Max idle wait for an enqueue notification
+
+# Worker settings
+WORKER_HANDLER_THREADS = int(os.getenv("WORKER_HANDLER_THREADS", "8"))  # Concurrent handler calls per batch
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "1"))  # Worker processes for standalone dispatcher
 
 
 def validate_config():
@@ -2,18 +2,84 @@
 import time
 import signal
 import sys
-from typing import Optional
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Tuple
 
 from src import settings
 from src.logging_conf import logger
 from src.queue.postgres_queue import PostgresQueue
 from src.queue.models import QueueItem
 from src.db.postgres_impl import PostgresDatabase
-from src.workers.handlers.teamwork_events import TeamworkEventHandler
+from src.workers.handlers.teamwork_events import TeamworkEventHandler, TASK_UPSERT_EVENTS
 from src.workers.handlers.missive_events import MissiveEventHandler
 from src.workers.handlers.craft_events import CraftEventHandler
 
 
+def _enrich_teamwork(item: QueueItem) -> dict:
+    """Return the payload with the task ID filled in from the queue item."""
+    payload = item.payload
+    if payload and "id" in payload:
+        return payload
+    enriched = dict(payload) if payload else {}
+    enriched["id"] = item.external_id
+    return enriched
+
+
+def _is_teamwork_deletion(item: QueueItem) -> bool:
+    """Check whether a Teamwork queue item is a deletion (same rule as the handler)."""
+    if item.payload and item.payload.get("deleted"):
+        return True
+    event_type = item.event_type
+    return event_type not in TASK_UPSERT_EVENTS and "deleted" in event_type.lower()
+
+
+def _enrich_missive(item: QueueItem) -> dict:
+    """Return the payload with the conversation ID filled in from the queue item."""
+    payload = item.payload
+    if payload and "conversation_id" in payload and "id" in payload:
+        return payload
+    enriched = dict(payload) if payload else {}
+    enriched.setdefault("conversation_id", item.external_id)
+    enriched.setdefault("id", item.external_id)
+    return enriched
+
+
+def _enrich_craft(item: QueueItem) -> dict:
+    """Return the payload with the document ID filled in from the queue item."""
+    payload = item.payload
+    if payload and "id" in payload and "document_id" in payload:
+        return payload
+    enriched = dict(payload) if payload else {}
+    enriched.setdefault("id", item.external_id)
+    enriched.setdefault("document_id", item.external_id)
+    return enriched
+
+
+class _LockedDatabase:
+    """
+    Database proxy that serializes calls made from handler threads.
+    
+    Handlers run concurrently in the dispatcher's thread pool but share a single
+    psycopg2 connection, whose transactions must not interleave.
+    """
+    
+    def __init__(self, db: PostgresDatabase, lock: threading.RLock):
+        self._db = db
+        self._lock = lock
+    
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._db, name)
+        if not callable(attr):
+            return attr
+        
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+        return locked
+
+
 class WorkerDispatcher:
     """Dispatcher that processes queued events with database resilience."""
     
@@ -23,9 +89,19 @@ class WorkerDispatcher:
         self.teamwork_handler: Optional[TeamworkEventHandler] = None
         self.missive_handler: Optional[MissiveEventHandler] = None
         self.craft_handler: Optional[CraftEventHandler] = None
+        # Optional relational link operations, resolved once per database instance
+        self._link_tags = None
+        self._link_assignees = None
         self.running = True
         self._db_available = False
         
+        # Handlers (API fetches + parsing) run in a pool; DB access is serialized
+        self._pool = ThreadPoolExecutor(
+            max_workers=settings.WORKER_HANDLER_THREADS,
+            thread_name_prefix="handler",
+        )
+        self._db_lock = threading.RLock()
+        
         # Register signal handlers for graceful shutdown (only in main thread)
         if register_signals:
             try:
@@ -43,7 +119,7 @@ class WorkerDispatcher:
             logger.info("Connecting to PostgreSQL database")
             return PostgresDatabase()
         except Exception as e:
-            logger.warning(f"Failed to initialize database: {e}")
+            logger.warning("Failed to initialize database: %s", e)
             return None
     
     def _ensure_database(self) -> bool:
@@ -73,6 +149,8 @@ class WorkerDispatcher:
             self.teamwork_handler = None
             self.missive_handler = None
             self.craft_handler = None
+            self._link_tags = None
+            self._link_assignees = None
             self._db_available = False
         
         # Try to create a new database connection
@@ -81,9 +159,12 @@ class WorkerDispatcher:
         if self.db is not None:
             # Initialize queue and handlers
             self.queue = PostgresQueue(self.db)
-            self.teamwork_handler = TeamworkEventHandler(self.db)
-            self.missive_handler = MissiveEventHandler(self.db)
+            handler_db = _LockedDatabase(self.db, self._db_lock)
+            self.teamwork_handler = TeamworkEventHandler(handler_db)
+            self.missive_handler = MissiveEventHandler(handler_db)
             self.craft_handler = CraftEventHandler(self.db)
+            self._link_tags = getattr(self.db, 'link_task_tags_batch', None)
+            self._link_assignees = getattr(self.db, 'link_task_assignees_batch', None)
             self._db_available = True
             logger.info("Database connection established successfully")
             return True
@@ -93,7 +174,7 @@ class WorkerDispatcher:
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully."""
-        logger.info(f"Received signal {signum}. Shutting down gracefully...")
+        logger.info("Received signal %s. Shutting down gracefully...", signum)
         self.running = False
     
     def run(self):
@@ -109,8 +190,8 @@ class WorkerDispatcher:
                 if not self._ensure_database():
                     consecutive_db_failures += 1
                     logger.warning(
-                        f"Database unavailable (attempt {consecutive_db_failures}). "
-                        f"Waiting {db_retry_delay}s before retry..."
+                        "Database unavailable (attempt %s). Waiting %ss before retry...",
+                        consecutive_db_failures, db_retry_delay,
                     )
                     time.sleep(db_retry_delay)
                     # Exponential backoff with cap
@@ -122,17 +203,16 @@ class WorkerDispatcher:
                 db_retry_delay = settings.DB_RECONNECT_DELAY
                 
                 # Get items from queue
-                items = self.queue.dequeue_batch(max_items=10)
+                items = self.queue.dequeue_batch(max_items=10, wait_timeout=settings.QUEUE_WAIT_SECONDS)
                 
                 if not items:
-                    # Queue is empty, sleep briefly and check again
-                    time.sleep(0.5)
+                    # Queue stayed empty for the whole wait, check again
                     continue
                 
                 # Process the batch
                 try:
                     self._process_batch(items)
-                    logger.info(f"Successfully processed batch of {len(items)} events")
+                    logger.info("Successfully processed batch of %s events", len(items))
                     
                 except Exception as e:
                     error_msg = f"Error processing batch: {e}"
@@ -148,10 +228,10 @@ class WorkerDispatcher:
                         try:
                             self.queue.mark_batch_failed(items, error_msg)
                         except Exception as mark_err:
-                            logger.error(f"Failed to mark items as failed: {mark_err}")
+                            logger.error("Failed to mark items as failed: %s", mark_err)
             
             except Exception as e:
-                logger.error(f"Unexpected error in worker loop: {e}", exc_info=True)
+                logger.error("Unexpected error in worker loop: %s", e, exc_info=True)
                 
                 # Check if database-related
                 if self._is_database_error(e):
@@ -183,210 +263,272 @@ class WorkerDispatcher:
     def _cleanup(self):
         """Clean up resources."""
         logger.info("Worker dispatcher shutting down")
+        self._pool.shutdown(wait=True)
+        if self.craft_handler is not None:
+            try:
+                failed_doc_ids = self.craft_handler.flush()
+                if failed_doc_ids:
+                    logger.warning("Failed to write %s Craft documents on shutdown", len(failed_doc_ids))
+            except Exception as e:
+                logger.warning("Error flushing Craft documents: %s", e)
         if self.db is not None:
             try:
                 self.db.close()
             except Exception as e:
-                logger.warning(f"Error closing database: {e}")
+                logger.warning("Error closing database: %s", e)
     
     def _process_batch(self, items: list) -> None:
         """
         Process a batch of queue items.
         
+        Payloads passed to handlers may be the queue item's own dict, so handlers
+        must treat them as read-only.
+        
         Args:
             items: List of QueueItems to process
         """
-        from src.db.models import Email, Task
+        # Separate items by source in a single pass
+        buckets = {"teamwork": [], "missive": [], "craft": []}
+        for item in items:
+            bucket = buckets.get(item.source)
+            if bucket is not None:
+                bucket.append(item)
+            else:
+                logger.warning("Unknown source: %s", item.source)
+        teamwork_items = buckets["teamwork"]
+        missive_items = buckets["missive"]
+        craft_items = buckets["craft"]
         
-        # Separate items by source
-        teamwork_items = [item for item in items if item.source == "teamwork"]
-        missive_items = [item for item in items if item.source == "missive"]
-        craft_items = [item for item in items if item.source == "craft"]
+        # Items are marked completed/failed together at the end of the batch
+        completed = []
+        failed = []  # List of (item, error_msg)
+        submit = self._pool.submit
+        
+        # Deletions only need a DB update, so they skip the handler (and its API fetch)
+        if teamwork_items:
+            deletions = []
+            upserts = []
+            for item in teamwork_items:
+                (deletions if _is_teamwork_deletion(item) else upserts).append(item)
+            if deletions:
+                teamwork_items = upserts
+                try:
+                    self.db.mark_tasks_deleted([item.external_id for item in deletions])
+                    completed.extend(deletions)
+                except Exception as e:
+                    failed.extend((item, str(e)) for item in deletions)
         
         # Process Teamwork items
         if teamwork_items:
             # Track items and their corresponding tasks for proper completion marking
             item_task_pairs = []  # List of (item, task_or_none)
+            futures = []
             
+            # Repeated events for the same task in one batch share a single fetch
+            process_event = self.teamwork_handler.process_event
+            pending = {}
             for item in teamwork_items:
+                key = (item.event_type, item.external_id)
+                future = pending.get(key)
+                if future is None:
+                    future = pending[key] = submit(process_event, item.event_type, _enrich_teamwork(item))
+                futures.append((item, future))
+            
+            # Collect tasks in queue order so later events win on upsert
+            for item, future in futures:
                 try:
-                    payload = dict(item.payload or {})
-                    payload.setdefault("id", item.external_id)
-                    
-                    # Collect tasks from handler
-                    task = self.teamwork_handler.process_event(item.event_type, payload)
+                    task = future.result()
                     item_task_pairs.append((item, task))
                     
                 except Exception as e:
-                    logger.error(f"Error processing teamwork item {item.external_id}: {e}", exc_info=True)
-                    self.queue.mark_item_failed(item, str(e), retry=True)
+                    logger.error("Error processing teamwork item %s: %s", item.external_id, e, exc_info=True)
+                    failed.append((item, str(e)))
             
             # Batch upsert tasks - only mark completed AFTER successful DB operations
-            tasks = [task for _, task in item_task_pairs if task]
+            # Keep only the latest task per ID (queue order, last writer wins)
+            tasks = list({task.task_id: task for _, task in item_task_pairs if task}.values())
             if tasks:
                 try:
                     self.db.upsert_tasks_batch(tasks)
                     
                     # Link tags and assignees if using relational structure
-                    if hasattr(self.db, 'link_task_tags'):
-                        for task in tasks:
-                            try:
-                                # Link tags if available
-                                tag_ids = task.raw.get("_tag_ids_to_link", [])
-                                if tag_ids:
-                                    self.db.link_task_tags(task.task_id, tag_ids)
-                                
-                                # Link assignees if available
-                                assignee_user_ids = task.raw.get("_assignee_user_ids_to_link", [])
-                                if assignee_user_ids:
-                                    self.db.link_task_assignees(task.task_id, assignee_user_ids)
-                            except Exception as e:
-                                logger.error(f"Error linking task {task.task_id} relationships: {e}", exc_info=True)
+                    self._link_task_relations(tasks)
                     
                     # Mark all items as completed only after successful batch upsert
-                    for item, _ in item_task_pairs:
-                        self.queue.mark_item_completed(item)
+                    completed.extend(item for item, _ in item_task_pairs)
                         
                 except Exception as e:
-                    logger.warning(f"Batch upsert failed, falling back to individual processing: {e}")
+                    logger.warning("Batch upsert failed, falling back to individual processing: %s", e)
                     # Fallback: process each item individually to isolate failures
-                    self._process_teamwork_items_individually(item_task_pairs)
+                    done, errors = self._process_teamwork_items_individually(item_task_pairs)
+                    completed.extend(done)
+                    failed.extend(errors)
             else:
                 # No tasks to upsert, mark items as completed (e.g., deleted tasks)
-                for item, _ in item_task_pairs:
-                    self.queue.mark_item_completed(item)
+                completed.extend(item for item, _ in item_task_pairs)
         
         # Process Missive items
         if missive_items:
             # Track items and their corresponding emails for proper completion marking
             item_email_pairs = []  # List of (item, emails_list_or_none)
+            futures = []
             
+            # Repeated events for the same conversation in one batch share a single fetch
+            process_event = self.missive_handler.process_event
+            pending = {}
             for item in missive_items:
+                key = (item.event_type, item.external_id)
+                future = pending.get(key)
+                if future is None:
+                    future = pending[key] = submit(process_event, item.event_type, _enrich_missive(item))
+                futures.append((item, future))
+            
+            # Collect emails in queue order
+            for item, future in futures:
                 try:
-                    payload = dict(item.payload or {})
-                    payload.setdefault("conversation_id", item.external_id)
-                    payload.setdefault("id", item.external_id)
-                    
-                    # Collect emails from handler
-                    item_emails = self.missive_handler.process_event(item.event_type, payload)
+                    item_emails = future.result()
                     item_email_pairs.append((item, item_emails))
                     
                 except Exception as e:
-                    logger.error(f"Error processing missive item {item.external_id}: {e}", exc_info=True)
-                    self.queue.mark_item_failed(item, str(e), retry=True)
+                    logger.error("Error processing missive item %s: %s", item.external_id, e, exc_info=True)
+                    failed.append((item, str(e)))
             
-            # Batch upsert emails
-            all_emails = []
-            for _, emails in item_email_pairs:
-                if emails:
-                    all_emails.extend(emails)
+            # Batch upsert emails, keeping only the latest email per ID
+            all_emails = list({
+                email.email_id: email
+                for _, emails in item_email_pairs if emails
+                for email in emails
+            }.values())
             
             if all_emails:
                 try:
                     self.db.upsert_emails_batch(all_emails)
                     # Mark all items as completed only after successful batch upsert
-                    for item, _ in item_email_pairs:
-                        self.queue.mark_item_completed(item)
+                    completed.extend(item for item, _ in item_email_pairs)
                 except Exception as e:
-                    logger.warning(f"Batch email upsert failed, falling back to individual processing: {e}")
+                    logger.warning("Batch email upsert failed, falling back to individual processing: %s", e)
                     # Fallback: process each item individually
-                    self._process_missive_items_individually(item_email_pairs)
+                    done, errors = self._process_missive_items_individually(item_email_pairs)
+                    completed.extend(done)
+                    failed.extend(errors)
             else:
                 # No emails to upsert, mark items as completed
-                for item, _ in item_email_pairs:
-                    self.queue.mark_item_completed(item)
+                completed.extend(item for item, _ in item_email_pairs)
         
         # Process Craft items
-        # Craft documents are processed individually (handler does DB upsert directly)
         if craft_items:
+            craft_done = []  # List of (item, buffered_doc_id_or_none)
             for item in craft_items:
                 try:
-                    payload = dict(item.payload or {})
-                    payload.setdefault("id", item.external_id)
-                    payload.setdefault("document_id", item.external_id)
+                    payload = _enrich_craft(item)
                     
-                    # Process document - handler does upsert directly
+                    # Process document - updated documents are buffered until flush()
                     result = self.craft_handler.process_event(item.event_type, payload)
                     
-                    # Mark as completed (result is None for deleted docs, dict for success)
-                    self.queue.mark_item_completed(item)
+                    # Result is None for deleted/skipped docs, the buffered dict otherwise
+                    craft_done.append((item, result["id"] if result else None))
                     
                 except Exception as e:
-                    logger.error(f"Error processing craft item {item.external_id}: {e}", exc_info=True)
-                    self.queue.mark_item_failed(item, str(e), retry=True)
+                    logger.error("Error processing craft item %s: %s", item.external_id, e, exc_info=True)
+                    failed.append((item, str(e)))
+            
+            # Write buffered documents before their items are marked completed
+            failed_doc_ids = set(self.craft_handler.flush())
+            for item, doc_id in craft_done:
+                if doc_id in failed_doc_ids:
+                    failed.append((item, f"Failed to upsert Craft document {doc_id}"))
+                else:
+                    completed.append(item)
+        
+        if completed:
+            self.queue.mark_batch_completed(completed)
+        if failed:
+            self.queue.mark_batch_failed_with_errors(failed, retry=True)
+    
+    def _link_task_relations(self, tasks: list) -> None:
+        """Link tags and assignees for upserted tasks with one batch call per relation."""
+        if self._link_tags is not None:
+            tag_links = {}
+            for task in tasks:
+                tag_ids = task.raw.get("_tag_ids_to_link")
+                if tag_ids:
+                    tag_links[task.task_id] = tag_ids
+            if tag_links:
+                self._link_tags(tag_links)
+        
+        if self._link_assignees is not None:
+            assignee_links = {}
+            for task in tasks:
+                assignee_user_ids = task.raw.get("_assignee_user_ids_to_link")
+                if assignee_user_ids:
+                    assignee_links[task.task_id] = assignee_user_ids
+            if assignee_links:
+                self._link_assignees(assignee_links)
     
-    def _process_teamwork_items_individually(self, item_task_pairs: list) -> None:
+    def _process_teamwork_items_individually(self, item_task_pairs: list) -> Tuple[list, list]:
         """
         Process teamwork items one by one when batch processing fails.
         This isolates failing items so others can succeed.
+        
+        Returns:
+            Tuple of (completed items, list of (failed item, error message))
         """
+        completed = []
+        failed = []
         for item, task in item_task_pairs:
             if task:
                 try:
                     self.db.upsert_tasks_batch([task])
                     
                     # Link tags and assignees
-                    if hasattr(self.db, 'link_task_tags'):
-                        tag_ids = task.raw.get("_tag_ids_to_link", [])
-                        if tag_ids:
-                            self.db.link_task_tags(task.task_id, tag_ids)
-                        
-                        assignee_user_ids = task.raw.get("_assignee_user_ids_to_link", [])
-                        if assignee_user_ids:
-                            self.db.link_task_assignees(task.task_id, assignee_user_ids)
+                    self._link_task_relations([task])
                     
-                    self.queue.mark_item_completed(item)
-                    logger.debug(f"Successfully processed task {task.task_id} individually")
+                    completed.append(item)
+                    logger.debug("Successfully processed task %s individually", task.task_id)
                 except Exception as e:
                     error_msg = f"Individual task upsert failed for {task.task_id}: {e}"
                     logger.error(error_msg)
-                    self.queue.mark_item_failed(item, error_msg, retry=True)
+                    failed.append((item, error_msg))
             else:
                 # No task (e.g., deletion event) - mark as completed
-                self.queue.mark_item_completed(item)
+                completed.append(item)
+        return completed, failed
     
-    def _process_missive_items_individually(self, item_email_pairs: list) -> None:
+    def _process_missive_items_individually(self, item_email_pairs: list) -> Tuple[list, list]:
         """
         Process missive items one by one when batch processing fails.
         This isolates failing items so others can succeed.
+        
+        Returns:
+            Tuple of (completed items, list of (failed item, error message))
         """
+        completed = []
+        failed = []
         for item, emails in item_email_pairs:
             if emails:
                 try:
                     self.db.upsert_emails_batch(emails)
-                    self.queue.mark_item_completed(item)
-                    logger.debug(f"Successfully processed emails for {item.external_id} individually")
+                    completed.append(item)
+                    logger.debug("Successfully processed emails for %s individually", item.external_id)
                 except Exception as e:
                     error_msg = f"Individual email upsert failed for {item.external_id}: {e}"
                     logger.error(error_msg)
-                    self.queue.mark_item_failed(item, error_msg, retry=True)
+                    failed.append((item, error_msg))
             else:
                 # No emails - mark as completed
-                self.queue.mark_item_completed(item)
+                completed.append(item)
+        return completed, failed
+
+
+def _run_worker() -> None:
+    """Run a single dispatcher until shutdown (entry point for worker processes)."""
+    dispatcher = WorkerDispatcher()
     
-    def _process_item(self, item: QueueItem) -> None:
-        """
-        Process a single queue item (legacy method, kept for compatibility).
-        
-        Args:
-            item: Queue item to process
-        """
-        # Enrich payload with external ID so handlers can operate with ID-only queue items
-        payload = dict(item.payload or {})
-        if item.source == "teamwork":
-            payload.setdefault("id", item.external_id)
-            self.teamwork_handler.handle_event(item.event_type, payload)
-        elif item.source == "missive":
-            # For Missive, prefer conversation ID
-            payload.setdefault("conversation_id", item.external_id)
-            payload.setdefault("id", item.external_id)
-            self.missive_handler.handle_event(item.event_type, payload)
-        elif item.source == "craft":
-            payload.setdefault("id", item.external_id)
-            payload.setdefault("document_id", item.external_id)
-            self.craft_handler.handle_event(item.event_type, payload)
-        else:
-            logger.warning(f"Unknown source: {item.source}")
+    try:
+        dispatcher.run()
+    except Exception as e:
+        logger.error("Fatal error in dispatcher: %s", e, exc_info=True)
+        sys.exit(1)
 
 
 def main():
@@ -394,15 +536,38 @@ def main():
     try:
         settings.validate_config()
     except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         sys.exit(1)
     
-    dispatcher = WorkerDispatcher()
+    concurrency = max(1, settings.WORKER_CONCURRENCY)
+    if concurrency == 1:
+        _run_worker()
+        return
     
-    try:
-        dispatcher.run()
-    except Exception as e:
-        logger.error(f"Fatal error in dispatcher: {e}", exc_info=True)
+    # Each process has its own connection and worker_id; dequeue_items claims rows
+    # per worker, so processes never receive the same item
+    logger.info("Starting %s worker processes", concurrency)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_run_worker, name=f"worker-{i}")
+        for i in range(concurrency)
+    ]
+    for process in processes:
+        process.start()
+    
+    def forward_signal(signum, frame):
+        logger.info("Received signal %s. Stopping worker processes...", signum)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+    
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+    
+    for process in processes:
+        process.join()
+    
+    if any(process.exitcode for process in processes):
         sys.exit(1)
 
 
@@ -1,5 +1,7 @@
 """Handler for Craft document events."""
-from typing import Dict, Any, Optional
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 
 from src.logging_conf import logger
 from src.db.interface import DatabaseInterface
@@ -8,21 +10,73 @@ from src.connectors.craft_markdown_parser import parse_craft_markdown
 from src.connectors.craft_image_handler import process_document_media
 
 
+# LRU of parsed markdown keyed by raw content digest; metadata-only updates
+# (moves, renames) re-fetch identical content
+_PARSE_CACHE_SIZE = 256
+_parse_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+
+def _parse_markdown_cached(raw_content: str) -> str:
+    """Parse Craft markdown, reusing the result for previously seen content."""
+    key = hashlib.blake2b(raw_content.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    parsed = _parse_cache.get(key)
+    if parsed is not None:
+        _parse_cache.move_to_end(key)
+        return parsed
+    
+    parsed = parse_craft_markdown(raw_content)
+    _parse_cache[key] = parsed
+    if len(_parse_cache) > _PARSE_CACHE_SIZE:
+        _parse_cache.popitem(last=False)
+    return parsed
+
+
 class CraftEventHandler:
     """Handles Craft document events from the queue."""
     
     def __init__(self, db: DatabaseInterface):
         self.db = db
         self.craft_client = CraftClient()
+        # Documents are buffered and written in one batch by flush()
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_threshold = 500
+        # IDs that failed in a threshold flush, reported by the next flush()
+        self._failed_ids: List[str] = []
     
     def handle_event(self, event_type: str, payload: Dict[str, Any]) -> None:
         """Handle a Craft event (legacy method for compatibility)."""
         self.process_event(event_type, payload)
+        failed_ids = self.flush()
+        if failed_ids:
+            raise RuntimeError(f"Failed to upsert Craft documents: {', '.join(failed_ids)}")
+    
+    def flush(self) -> List[str]:
+        """
+        Write all buffered documents with a single batch upsert.
+        
+        If the batch fails, each document is retried on its own so one bad
+        document does not drop the others.
+        
+        Returns:
+            IDs of documents that could not be written
+        """
+        failed_ids, self._failed_ids = self._failed_ids, []
+        if not self._pending:
+            return failed_ids
+        pending, self._pending = self._pending, []
+        if self.db.upsert_craft_documents_batch(pending):
+            return failed_ids
+        
+        logger.warning("Craft batch upsert failed, retrying %s documents one by one", len(pending))
+        failed_ids.extend(doc["id"] for doc in pending if not self.db.upsert_craft_document(doc))
+        return failed_ids
     
     def process_event(self, event_type: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Process a Craft event and return the document data.
         
+        Updated documents are buffered; call flush() before treating the event as done.
+        
         Payload should contain path metadata from backfill:
         - title, folder_path, folder_id, location, daily_note_date
         - lastModifiedAt, createdAt, isDeleted
@@ -57,20 +111,11 @@ class CraftEventHandler:
             logger.warning("Craft client not configured")
             return None
         
-        raw_content = self.craft_client.get_document_content(doc_id, fetch_metadata=True)
-        
-        if raw_content is None:
-            logger.warning(f"Failed to fetch content for Craft document {doc_id}")
-            raw_content = ""
-        
-        parsed_content = parse_craft_markdown(raw_content) if raw_content else None
-        
-        if parsed_content and "r.craft.do" in (raw_content or ""):
-            json_blocks = self.craft_client.get_document_json(doc_id, fetch_metadata=False)
-            if json_blocks:
-                parsed_content = process_document_media(
-                    doc_id, json_blocks, parsed_content, self.craft_client.session,
-                )
+        parsed_content = self._get_unchanged_content(doc_id, payload.get("lastModifiedAt"))
+        if parsed_content is not None:
+            logger.debug(f"Craft document {doc_id} unchanged since last sync, skipping content fetch")
+        else:
+            parsed_content = self._fetch_document_content(doc_id)
         
         doc_data = {
             "id": doc_id,
@@ -85,12 +130,60 @@ class CraftEventHandler:
             "createdAt": payload.get("createdAt"),
         }
         
-        self.db.upsert_craft_document(doc_data)
-        logger.info(f"Upserted Craft document {doc_id}: {payload.get('title')}")
+        self._pending.append(doc_data)
+        logger.info(f"Prepared Craft document {doc_id} for upsert: {payload.get('title')}")
+        if len(self._pending) >= self._flush_threshold:
+            self._failed_ids.extend(self.flush())
         
         return doc_data
     
+    def _fetch_document_content(self, doc_id: str) -> Optional[str]:
+        """Fetch and parse document markdown, re-hosting Craft media."""
+        raw_content = self.craft_client.get_document_content(doc_id, fetch_metadata=True)
+        
+        if raw_content is None:
+            logger.warning(f"Failed to fetch content for Craft document {doc_id}")
+            raw_content = ""
+        
+        parsed_content = _parse_markdown_cached(raw_content) if raw_content else None
+        
+        if parsed_content and "r.craft.do" in (raw_content or ""):
+            json_blocks = self.craft_client.get_document_json(doc_id, fetch_metadata=False)
+            if json_blocks:
+                parsed_content = process_document_media(
+                    doc_id, json_blocks, parsed_content, self.craft_client.session,
+                )
+        return parsed_content
+    
+    def _get_unchanged_content(self, doc_id: str, last_modified_at: Optional[str]) -> Optional[str]:
+        """
+        Return the stored markdown if the document has not been modified since it was stored.
+        
+        Markdown still pointing at r.craft.do had its media re-host fail, so it is fetched
+        again to retry rather than reused.
+        
+        Returns:
+            Stored markdown content, or None if the document must be fetched
+        """
+        if not last_modified_at or not hasattr(self.db, 'get_craft_document'):
+            return None
+        
+        existing = self.db.get_craft_document(doc_id)
+        if not existing or not existing.get("markdown_content") or not existing.get("craft_last_modified_at"):
+            return None
+        if "r.craft.do" in existing["markdown_content"]:
+            return None
+        
+        # Parsed the same way as the stored craft_last_modified_at
+        modified = self.db._parse_dt(last_modified_at)
+        if modified is None or modified != existing["craft_last_modified_at"]:
+            return None
+        
+        return existing["markdown_content"]
+    
     def _handle_document_deleted(self, doc_id: str) -> None:
         """Handle document deletion event."""
+        # A buffered update of the same document would undo the delete when flushed
+        self._pending = [doc for doc in self._pending if doc["id"] != doc_id]
         self.db.mark_craft_document_deleted(doc_id)
         logger.info(f"Marked Craft document {doc_id} as deleted")
@@ -1,22 +1,103 @@
 """Missive event handler."""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
-import re
-from html import unescape
+import hashlib
+import sys
+import threading
+
+import orjson
 
 from src.db.models import Email, Attachment
 from src.db.interface import DatabaseInterface
 from src.connectors.missive_client import MissiveClient
+from src.connectors.html_text import html_to_text
 from src.logging_conf import logger
 from src import settings
 
 
+# datetime.fromisoformat accepts a trailing "Z" from Python 3.11 on
+_ISO_ACCEPTS_Z = sys.version_info >= (3, 11)
+
+
+def _parse_ts(value: Any) -> Optional[datetime]:
+    """Parse a Missive timestamp (Unix seconds or ISO 8601 string) into a datetime."""
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    value = str(value)
+    if not _ISO_ACCEPTS_Z and value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _parse_process_after(value: Optional[str]) -> Optional[datetime]:
+    """Parse a DD.MM.YYYY processing threshold into a UTC datetime."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%d.%m.%Y").replace(tzinfo=timezone.utc)
+    except ValueError as e:
+        logger.warning("Invalid MISSIVE_PROCESS_AFTER %r, date filter disabled: %s", value, e)
+        return None
+
+
+def _split_label_names(names: Optional[str]) -> List[str]:
+    """Split Missive's comma-separated shared_label_names, stripping each name once."""
+    if not names:
+        return []
+    return [name for name in map(str.strip, names.split(",")) if name]
+
+
+# Digest of the last message payload and conversation written per message ID in this process, so
+# re-fetched conversations skip unchanged messages instead of rewriting them
+_MESSAGE_DIGEST_CACHE_SIZE = 10000
+_message_digests: "OrderedDict[str, bytes]" = OrderedDict()
+_message_digests_lock = threading.Lock()
+
+
+def _message_digest(message_data: Dict[str, Any], conversation_id: str) -> bytes:
+    """Fingerprint a message payload independent of key order, together with its conversation."""
+    digest = hashlib.blake2b(str(conversation_id).encode(), digest_size=16)
+    digest.update(b"\0")
+    digest.update(orjson.dumps(message_data, option=orjson.OPT_SORT_KEYS))
+    return digest.digest()
+
+
+# One fetch pool per process: handlers run in the dispatcher's thread pool, so a pool per
+# conversation would multiply MISSIVE_FETCH_WORKERS by WORKER_HANDLER_THREADS
+_fetch_pool: Optional[ThreadPoolExecutor] = None
+_fetch_pool_lock = threading.Lock()
+
+
+def _get_fetch_pool() -> ThreadPoolExecutor:
+    """Return the process-wide pool that bounds concurrent get_message calls."""
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.MISSIVE_FETCH_WORKERS),
+                thread_name_prefix="missive-fetch",
+            )
+        return _fetch_pool
+
+
 class MissiveEventHandler:
     """Handler for Missive webhook events."""
     
     def __init__(self, db: DatabaseInterface):
         self.db = db
         self.client = MissiveClient()
+        # Parsed once instead of per message
+        self._process_after = _parse_process_after(settings.MISSIVE_PROCESS_AFTER)
     
     def process_event(self, event_type: str, payload: Dict[str, Any]) -> Optional[List[Email]]:
         """
@@ -30,27 +111,27 @@ class MissiveEventHandler:
         Returns:
             List of Email objects to be batch upserted, or None
         """
-        logger.info(f"Processing Missive event: {event_type}")
+        logger.info("Processing Missive event: %s", event_type)
         
         # Extract conversation/message data
         conversation_id = self._extract_conversation_id(payload)
         if not conversation_id:
-            logger.warning(f"No conversation ID found in payload for event {event_type}")
+            logger.warning("No conversation ID found in payload for event %s", event_type)
             return None
         
         # Handle deletion/trash events: fetch messages first, then mark deleted
-        if "deleted" in event_type.lower() or "trashed" in event_type.lower():
+        event_type_lower = event_type.lower()
+        if "deleted" in event_type_lower or "trashed" in event_type_lower:
             messages = self.client.get_conversation_messages(conversation_id)
-            for msg in messages:
-                msg_id = str(msg.get("id", ""))
-                if msg_id:
-                    self.db.mark_email_deleted(msg_id)
+            msg_ids = [str(msg["id"]) for msg in messages if msg.get("id")]
+            if msg_ids:
+                self.db.mark_emails_deleted(msg_ids)
             return None
         
         # Fetch full conversation data
         conversation = self.client.get_conversation(conversation_id)
         if not conversation:
-            logger.warning(f"Could not fetch conversation {conversation_id}")
+            logger.warning("Could not fetch conversation %s", conversation_id)
             return None
         
         # Upsert conversation (raises on failure → dispatcher marks item failed with retry)
@@ -59,47 +140,104 @@ class MissiveEventHandler:
         
         # Handle comment events or backfill - fetch and store all comments for the conversation
         # In polling mode, backfill events should also fetch comments to ensure complete data sync
-        if event_type == "new_comment" or "comment" in event_type.lower() or "backfill" in event_type.lower():
+        if "comment" in event_type_lower or "backfill" in event_type_lower:
             self._process_conversation_comments(conversation_id)
             # Comments don't produce Email objects, but we still process messages below
         
         # Get conversation labels for Email objects
-        conversation_labels = []
-        if conversation.get("shared_label_names"):
-            conversation_labels = [label.strip() for label in conversation["shared_label_names"].split(",") if label.strip()]
+        conversation_labels = _split_label_names(conversation.get("shared_label_names"))
         
         # Always fetch fresh messages from API to ensure consistency
         messages = self.client.get_conversation_messages(conversation_id)
         
+        # Fetch full message details to get complete body (not just preview)
+        full_messages = self._fetch_full_messages(messages)
+        
         emails = []
         # Process each message
         for message_data in messages:
             try:
-                # Fetch full message details to get complete body (not just preview)
                 message_id = str(message_data.get("id", ""))
-                if message_id:
-                    full_message = self.client.get_message(message_id)
-                    if full_message:
-                        # Use full message data which includes complete body
-                        message_data = full_message
+                full_message = full_messages.get(message_id)
+                if full_message:
+                    # Use full message data which includes complete body
+                    message_data = full_message
                 
                 # Check if message should be filtered based on received date
                 if self._should_filter_by_date(message_data):
-                    logger.info(f"Message {message_id} filtered: received before MISSIVE_PROCESS_AFTER threshold")
+                    logger.info("Message %s filtered: received before MISSIVE_PROCESS_AFTER threshold", message_id)
                     continue
                 
                 # Upsert message (raises on failure → dispatcher marks item failed with retry)
                 if hasattr(self.db, 'upsert_m_message'):
-                    self.db.upsert_m_message(message_data, conversation_id)
+                    self._upsert_message_if_changed(message_id, message_data, conversation_id)
                 
                 # Create Email object for legacy support
                 email = self._parse_message(message_data, conversation_id, conversation_labels)
                 emails.append(email)
             except Exception as e:
-                logger.error(f"Error processing message: {e}", exc_info=True)
+                logger.error("Error processing message: %s", e, exc_info=True)
         
         return emails if emails else None
     
+    def _fetch_full_messages(self, messages: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch full message details for a conversation's messages.
+        
+        Uses multi-ID requests where the API accepts them; anything still missing
+        is fetched one message at a time through the process-wide fetch pool.
+        
+        Args:
+            messages: Message summaries from the conversation listing
+        
+        Returns:
+            Dict of message ID to full message (messages that could not be fetched are omitted)
+        """
+        needed = [str(m["id"]) for m in messages if m.get("id") and self._needs_full_fetch(m)]
+        skipped = sum(1 for m in messages if m.get("id")) - len(needed)
+        if skipped:
+            logger.debug("Skipped %s message fetches (listing already has full body)", skipped)
+        # Fetch each message once even if the listing repeats it (order preserved)
+        message_ids = list(dict.fromkeys(needed))
+        if not message_ids:
+            return {}
+        
+        full_messages = {}
+        if len(message_ids) > 1 and self.client.bulk_messages_supported:
+            full_messages = self.client.get_messages(message_ids)
+            message_ids = [message_id for message_id in message_ids if message_id not in full_messages]
+            if not message_ids:
+                return full_messages
+        
+        results = _get_fetch_pool().map(self.client.get_message, message_ids)
+        
+        full_messages.update((message_id, full) for message_id, full in zip(message_ids, results) if full)
+        return full_messages
+    
+    def _needs_full_fetch(self, message_data: Dict[str, Any]) -> bool:
+        """Check whether a listed message lacks the body or fields needed for upsert."""
+        body = message_data.get("body")
+        if not body or body == message_data.get("preview"):
+            return True
+        return "attachments" not in message_data or "to_fields" not in message_data
+    
+    def _upsert_message_if_changed(self, message_id: str, message_data: Dict[str, Any], conversation_id: str) -> None:
+        """Upsert a message unless this process already wrote an identical payload for it."""
+        digest = _message_digest(message_data, conversation_id)
+        with _message_digests_lock:
+            if _message_digests.get(message_id) == digest:
+                _message_digests.move_to_end(message_id)
+                logger.debug("Message %s unchanged, skipping upsert", message_id)
+                return
+        
+        self.db.upsert_m_message(message_data, conversation_id)
+        
+        with _message_digests_lock:
+            _message_digests[message_id] = digest
+            _message_digests.move_to_end(message_id)
+            if len(_message_digests) > _MESSAGE_DIGEST_CACHE_SIZE:
+                _message_digests.popitem(last=False)
+    
     def _process_conversation_comments(self, conversation_id: str) -> None:
         """
         Fetch and store all comments for a conversation.
@@ -113,17 +251,17 @@ class MissiveEventHandler:
         
         try:
             comments = self.client.get_all_conversation_comments(conversation_id)
-            logger.info(f"Fetched {len(comments)} comments for conversation {conversation_id}")
+            logger.info("Fetched %s comments for conversation %s", len(comments), conversation_id)
             
             for comment_data in comments:
                 try:
                     self.db.upsert_m_comment(comment_data, conversation_id)
                 except Exception as e:
                     comment_id = comment_data.get("id", "unknown")
-                    logger.error(f"Failed to upsert comment {comment_id}: {e}", exc_info=True)
+                    logger.error("Failed to upsert comment %s: %s", comment_id, e, exc_info=True)
         
         except Exception as e:
-            logger.error(f"Error processing comments for conversation {conversation_id}: {e}", exc_info=True)
+            logger.error("Error processing comments for conversation %s: %s", conversation_id, e, exc_info=True)
     
     def handle_event(self, event_type: str, payload: Dict[str, Any]) -> None:
         """
@@ -135,19 +273,17 @@ class MissiveEventHandler:
         """
         emails = self.process_event(event_type, payload)
         if emails:
-            for email in emails:
-                self.db.upsert_email(email)
+            self.db.upsert_emails_batch(emails)
     
     def _extract_conversation_id(self, payload: Dict[str, Any]) -> str:
         """Extract conversation ID from payload."""
-        if "conversation" in payload:
-            return str(payload["conversation"].get("id", ""))
-        if "conversation_id" in payload:
-            return str(payload["conversation_id"])
-        if "conversationId" in payload:
-            return str(payload["conversationId"])
-        if "id" in payload:
-            return str(payload["id"])
+        conversation = payload.get("conversation")
+        if conversation is not None:
+            return str(conversation.get("id", ""))
+        for key in ("conversation_id", "conversationId", "id"):
+            value = payload.get(key)
+            if value is not None:
+                return str(value)
         return ""
     
     def _fetch_conversation_labels(self, conversation_id: str) -> List[str]:
@@ -168,12 +304,11 @@ class MissiveEventHandler:
                 
                 # Parse comma-separated label names into a list
                 if shared_label_names:
-                    # Split by comma and strip whitespace from each label
-                    labels = [label.strip() for label in shared_label_names.split(",") if label.strip()]
-                    logger.debug(f"Found {len(labels)} labels for conversation {conversation_id}: {labels}")
+                    labels = _split_label_names(shared_label_names)
+                    logger.debug("Found %s labels for conversation %s: %s", len(labels), conversation_id, labels)
                     return labels
         except Exception as e:
-            logger.error(f"Error fetching conversation labels for {conversation_id}: {e}", exc_info=True)
+            logger.error("Error fetching conversation labels for %s: %s", conversation_id, e, exc_info=True)
         
         return []
     
@@ -189,93 +324,71 @@ class MissiveEventHandler:
         Returns:
             Email object
         """
-        message_id = str(data.get("id", ""))
+        get = data.get
+        message_id = str(get("id", ""))
         
-        # Parse dates
-        sent_at = None
-        received_at = None
-        
-        # Try to parse delivered_at (Unix timestamp)
-        if data.get("delivered_at"):
-            try:
-                # delivered_at is a Unix timestamp
-                if isinstance(data["delivered_at"], int):
-                    sent_at = datetime.fromtimestamp(data["delivered_at"], tz=timezone.utc)
-                    received_at = sent_at
-                else:
-                    # Sometimes it might be ISO format
-                    sent_at = datetime.fromisoformat(str(data["delivered_at"]).replace("Z", "+00:00"))
-                    received_at = sent_at
-            except (ValueError, AttributeError, OSError):
-                pass
-        
-        # Fallback to created_at if delivered_at is not available
-        if not received_at and data.get("created_at"):
-            try:
-                if isinstance(data["created_at"], int):
-                    received_at = datetime.fromtimestamp(data["created_at"], tz=timezone.utc)
-                else:
-                    received_at = datetime.fromisoformat(str(data["created_at"]).replace("Z", "+00:00"))
-            except (ValueError, AttributeError, OSError):
-                pass
+        # Parse dates: delivered_at (Unix timestamp, sometimes ISO), falling back to created_at
+        sent_at = _parse_ts(get("delivered_at"))
+        received_at = sent_at or _parse_ts(get("created_at"))
         
         # Parse from address and name
         from_address = None
         from_name = None
-        from_field = data.get("from_field", data.get("from"))
+        from_field = get("from_field", get("from"))
         if from_field:
-            if isinstance(from_field, dict):
+            field_type = type(from_field)
+            if field_type is dict:
                 from_address = from_field.get("address") or from_field.get("email")
                 from_name = from_field.get("name")
-            elif isinstance(from_field, str):
+            elif field_type is str:
                 from_address = from_field
         
         # Parse to addresses and names
-        to_addresses, to_names = self._parse_email_fields(data.get("to_fields", data.get("to", [])))
-        cc_addresses, cc_names = self._parse_email_fields(data.get("cc_fields", data.get("cc", [])))
-        bcc_addresses, bcc_names = self._parse_email_fields(data.get("bcc_fields", data.get("bcc", [])))
+        parse_fields = self._parse_email_fields
+        to_addresses, to_names = parse_fields(get("to_fields", get("to", [])))
+        cc_addresses, cc_names = parse_fields(get("cc_fields", get("cc", [])))
+        bcc_addresses, bcc_names = parse_fields(get("bcc_fields", get("bcc", [])))
         
         # Parse in_reply_to
-        in_reply_to = data.get("in_reply_to", [])
-        if not isinstance(in_reply_to, list):
+        in_reply_to = get("in_reply_to", [])
+        if type(in_reply_to) is not list:
             in_reply_to = [in_reply_to] if in_reply_to else []
         
         # Parse body
         # Missive API returns HTML in the "body" field, not in "body_html"
-        body_html = data.get("body", "")
+        body_html = get("body", "")
         
         # Convert HTML to plain text for body_text
         body_text = ""
         if body_html:
-            body_text = self._html_to_text(body_html)
+            body_text = html_to_text(body_html)
         
         # Fallback to preview if body is empty
-        if not body_html and data.get("preview"):
-            body_text = data.get("preview", "")
-            body_html = ""
+        if not body_html:
+            preview = get("preview")
+            if preview:
+                body_text = preview
+                body_html = ""
         
         # Use labels from conversation (labels are on conversation, not individual messages)
         labels = conversation_labels if conversation_labels else []
         
         # Parse draft status
-        draft = data.get("draft", False)
+        draft = get("draft", False)
         
         # Check if deleted/trashed
-        deleted = data.get("deleted", False) or data.get("trashed", False)
-        deleted_at = None
-        if deleted and data.get("trashed_at"):
-            try:
-                deleted_at = datetime.fromisoformat(data["trashed_at"].replace("Z", "+00:00"))
-            except (ValueError, AttributeError):
-                pass
+        deleted = get("deleted", False) or get("trashed", False)
+        deleted_at = _parse_ts(get("trashed_at")) if deleted else None
         
         # Parse attachments
-        attachments = self._parse_attachments(data.get("attachments", []))
+        attachments = self._parse_attachments(get("attachments", []))
+        
+        web_url = get("web_url")
         
         return Email(
             email_id=message_id,
             thread_id=conversation_id,
-            subject=data.get("subject"),
+            subject=get("subject"),
             from_address=from_address,
             from_name=from_name,
             to_addresses=to_addresses,
@@ -288,12 +401,12 @@ class MissiveEventHandler:
             body_text=body_text,
             body_html=body_html,
             sent_at=sent_at,
-            received_at=received_at or sent_at,
+            received_at=received_at,
             labels=labels,
             draft=draft,
             deleted=deleted,
             deleted_at=deleted_at,
-            source_links={"missive_url": data.get("web_url", "")} if data.get("web_url") else {},
+            source_links={"missive_url": web_url} if web_url else {},
             attachments=attachments
         )
     
@@ -311,75 +424,40 @@ class MissiveEventHandler:
         if not addresses:
             return [], []
         
-        if isinstance(addresses, str):
+        addresses_type = type(addresses)
+        if addresses_type is str:
             return [addresses], []
         
-        if isinstance(addresses, list):
+        if addresses_type is list:
             result_addresses = []
             result_names = []
             for addr in addresses:
-                if isinstance(addr, dict):
+                addr_type = type(addr)
+                if addr_type is dict:
                     email = addr.get("address") or addr.get("email")
-                    name = addr.get("name")
                     if email:
                         result_addresses.append(email)
-                        result_names.append(name or "")
-                elif isinstance(addr, str):
+                        result_names.append(addr.get("name") or "")
+                elif addr_type is str:
                     result_addresses.append(addr)
                     result_names.append("")
             return result_addresses, result_names
         
         return [], []
     
-    def _html_to_text(self, html: str) -> str:
-        """Convert HTML to plain text."""
-        if not html:
-            return ""
-        
-        # Remove script and style elements
-        text = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
-        
-        # Replace common block elements with newlines
-        text = re.sub(r'</(div|p|br|tr|h[1-6]|li)>', '\n', text, flags=re.IGNORECASE)
-        text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
-        
-        # Remove all remaining HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # Decode HTML entities
-        text = unescape(text)
-        
-        # Clean up whitespace
-        # Replace multiple spaces with single space
-        text = re.sub(r' +', ' ', text)
-        # Replace multiple newlines with double newline
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
-        # Remove leading/trailing whitespace from each line
-        text = '\n'.join(line.strip() for line in text.split('\n'))
-        # Remove leading/trailing whitespace from entire text
-        text = text.strip()
-        
-        return text
-    
     def _parse_attachments(self, attachments_data: List[Dict[str, Any]]) -> List[Attachment]:
-        """Parse attachment data."""
-        attachments = []
-        
-        for att_data in attachments_data:
-            try:
-                attachment = Attachment(
-                    filename=att_data.get("filename", att_data.get("name", "unknown")),
-                    content_type=att_data.get("content_type", att_data.get("type", "application/octet-stream")),
-                    byte_size=att_data.get("size", 0),
-                    source_url=att_data.get("download_url", att_data.get("url", "")),
-                    checksum=att_data.get("checksum")
-                )
-                attachments.append(attachment)
-            except Exception as e:
-                logger.error(f"Error parsing attachment: {e}", exc_info=True)
-        
-        return attachments
+        """Parse attachment data (non-dict entries are skipped)."""
+        return [
+            Attachment(
+                filename=att.get("filename", att.get("name", "unknown")),
+                content_type=att.get("content_type", att.get("type", "application/octet-stream")),
+                byte_size=att.get("size", 0),
+                source_url=att.get("download_url", att.get("url", "")),
+                checksum=att.get("checksum")
+            )
+            for att in attachments_data or ()
+            if type(att) is dict
+        ]
     
     def _should_filter_by_date(self, message_data: Dict[str, Any]) -> bool:
         """
@@ -391,29 +469,17 @@ class MissiveEventHandler:
         Returns:
             True if message should be filtered (skipped), False otherwise
         """
-        if not settings.MISSIVE_PROCESS_AFTER:
+        threshold_date = self._process_after
+        if threshold_date is None:
             return False
         
         try:
-            # Parse the threshold date from DD.MM.YYYY format
-            threshold_date = datetime.strptime(settings.MISSIVE_PROCESS_AFTER, "%d.%m.%Y")
-            threshold_date = threshold_date.replace(tzinfo=timezone.utc)
-            
             # Parse message received date
             # Try delivered_at first, then created_at
-            received_at = None
-            
             if message_data.get("delivered_at"):
-                if isinstance(message_data["delivered_at"], int):
-                    received_at = datetime.fromtimestamp(message_data["delivered_at"], tz=timezone.utc)
-                else:
-                    received_at = datetime.fromisoformat(str(message_data["delivered_at"]).replace("Z", "+00:00"))
-            
-            elif message_data.get("created_at"):
-                if isinstance(message_data["created_at"], int):
-                    received_at = datetime.fromtimestamp(message_data["created_at"], tz=timezone.utc)
-                else:
-                    received_at = datetime.fromisoformat(str(message_data["created_at"]).replace("Z", "+00:00"))
+                received_at = _parse_ts(message_data["delivered_at"])
+            else:
+                received_at = _parse_ts(message_data.get("created_at"))
             
             if not received_at:
                 # If no received date, don't filter
@@ -423,6 +489,6 @@ class MissiveEventHandler:
             return received_at < threshold_date
         
         except (ValueError, AttributeError, OSError) as e:
-            logger.warning(f"Error parsing dates for filtering: {e}")
+            logger.warning("Error parsing dates for filtering: %s", e)
             return False
 
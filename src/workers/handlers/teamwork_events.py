@@ -1,6 +1,12 @@
 """Teamwork event handler."""
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List, Set, Tuple
+from collections import OrderedDict
+from typing import Callable, Dict, Any, FrozenSet, Optional, List, Tuple
+import hashlib
+import sys
+import threading
+
+import orjson
 
 from src.db.models import Task
 from src.db.interface import DatabaseInterface
@@ -9,21 +15,87 @@ from src.logging_conf import logger
 from src import settings
 
 
+# datetime.fromisoformat accepts a trailing "Z" from Python 3.11 on
+_ISO_ACCEPTS_Z = sys.version_info >= (3, 11)
+
+
+def _parse_iso(value: Any) -> Optional[datetime]:
+    """Parse a Teamwork ISO 8601 timestamp; missing or malformed values give None."""
+    if not value or type(value) is not str:
+        return None
+    if not _ISO_ACCEPTS_Z and value[-1] == "Z":
+        value = value[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _parse_process_after(value: Optional[str]) -> Optional[datetime]:
+    """Parse a DD.MM.YYYY processing threshold into a UTC datetime."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%d.%m.%Y").replace(tzinfo=timezone.utc)
+    except ValueError as e:
+        logger.warning("Invalid TEAMWORK_PROCESS_AFTER %r, date filter disabled: %s", value, e)
+        return None
+
+
+def _user_display_name(user: Dict[str, Any], user_id: str) -> str:
+    """Full name of an included Teamwork user, falling back to email, then ID."""
+    first_name = user.get("firstName")
+    last_name = user.get("lastName")
+    full_name = f"{first_name} {last_name}" if first_name and last_name else first_name or last_name
+    return full_name or user.get("email") or user_id
+
+
+# Top-level payload keys that may carry the task ID, in lookup order
+_TASK_ID_KEYS = ("id", "taskId", "task_id")
+
+# Event types enqueued by the webhook and backfill; anything else gets the substring check
+TASK_UPSERT_EVENTS = frozenset({"task.updated", "task.backfill"})
+
+
+# Digests of included entities this process has written, keyed by (type, id).
+# Most webhooks repeat the same users, companies and projects, so unchanged
+# ones are not rewritten. A stale entry only causes a redundant upsert.
+_ENTITY_DIGEST_CACHE_SIZE = 10000
+_entity_digests: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+_entity_digests_lock = threading.Lock()
+
+
+def _entity_digest(entity_data: Dict[str, Any]) -> bytes:
+    """Fingerprint an included entity independent of key order."""
+    return hashlib.blake2b(orjson.dumps(entity_data, option=orjson.OPT_SORT_KEYS), digest_size=16).digest()
+
+
+# Task IDs dropped by the TEAMWORK_PROCESS_AFTER filter. createdAt never changes,
+# so later events for these tasks can skip the API fetch.
+_DATE_FILTERED_CACHE_SIZE = 50000
+_date_filtered_task_ids: "OrderedDict[str, None]" = OrderedDict()
+_date_filtered_lock = threading.Lock()
+
+
 # Module-level sync filter cache (shared across instances)
-_sync_filters_cache: Tuple[Set[int], Set[int]] = (set(), set())
+_sync_filters_cache: Tuple[FrozenSet[int], FrozenSet[int]] = (frozenset(), frozenset())
+# True while neither companies nor projects are excluded (the common case)
+_sync_filters_empty = True
 
 
-def refresh_sync_filters(db: DatabaseInterface) -> Tuple[Set[int], Set[int]]:
+def refresh_sync_filters(db: DatabaseInterface) -> Tuple[FrozenSet[int], FrozenSet[int]]:
     """Refresh the sync filters cache from database."""
-    global _sync_filters_cache
+    global _sync_filters_cache, _sync_filters_empty
     if hasattr(db, 'get_sync_filters'):
-        _sync_filters_cache = db.get_sync_filters()
-        if _sync_filters_cache[0] or _sync_filters_cache[1]:
-            logger.info(f"Sync filters loaded: {len(_sync_filters_cache[0])} companies, {len(_sync_filters_cache[1])} projects excluded")
+        excluded_companies, excluded_projects = db.get_sync_filters()
+        _sync_filters_cache = (frozenset(excluded_companies), frozenset(excluded_projects))
+        _sync_filters_empty = not (excluded_companies or excluded_projects)
+        if not _sync_filters_empty:
+            logger.info("Sync filters loaded: %s companies, %s projects excluded", len(_sync_filters_cache[0]), len(_sync_filters_cache[1]))
     return _sync_filters_cache
 
 
-def get_sync_filters() -> Tuple[Set[int], Set[int]]:
+def get_sync_filters() -> Tuple[FrozenSet[int], FrozenSet[int]]:
     """Get current sync filters (excluded_company_ids, excluded_project_ids)."""
     return _sync_filters_cache
 
@@ -34,6 +106,10 @@ class TeamworkEventHandler:
     def __init__(self, db: DatabaseInterface):
         self.db = db
         self.client = TeamworkClient()
+        # Parsed once instead of per event
+        self._process_after = _parse_process_after(settings.TEAMWORK_PROCESS_AFTER)
+        # Whether the database has the relational Teamwork entity tables
+        self._has_relational = hasattr(db, 'upsert_tw_companies_batch')
     
     def process_event(self, event_type: str, payload: Dict[str, Any]) -> Optional[Task]:
         """
@@ -46,23 +122,32 @@ class TeamworkEventHandler:
         Returns:
             Task object to be batch upserted, or None
         """
-        logger.info(f"Processing Teamwork event: {event_type}")
+        logger.info("Processing Teamwork event: %s", event_type)
         
         # Extract task ID from payload
         task_id = self._extract_task_id(payload)
         if not task_id:
-            logger.warning(f"No task ID found in payload for event {event_type}")
+            logger.warning("No task ID found in payload for event %s", event_type)
             return None
         
         # Handle deletion events
-        if "deleted" in event_type.lower() or payload.get("deleted"):
+        if payload.get("deleted") or (
+                event_type not in TASK_UPSERT_EVENTS and "deleted" in event_type.lower()):
             self.db.mark_task_deleted(task_id)
             return None
         
+        # Tasks already found to predate the threshold stay filtered
+        if self._process_after is not None:
+            with _date_filtered_lock:
+                if task_id in _date_filtered_task_ids:
+                    _date_filtered_task_ids.move_to_end(task_id)
+                    logger.debug("Task %s filtered: created before TEAMWORK_PROCESS_AFTER threshold (cached)", task_id)
+                    return None
+        
         # Fetch full task data from API with included resources
         api_response = self.client.get_task_by_id(task_id)
         if not api_response:
-            logger.warning(f"Could not fetch task {task_id} from Teamwork API")
+            logger.warning("Could not fetch task %s from Teamwork API", task_id)
             return None
         
         # Extract task data and included resources
@@ -71,12 +156,19 @@ class TeamworkEventHandler:
         
         # Check if task should be filtered based on created date
         if self._should_filter_by_date(task_data):
-            logger.info(f"Task {task_id} filtered: created before TEAMWORK_PROCESS_AFTER threshold")
+            logger.info("Task %s filtered: created before TEAMWORK_PROCESS_AFTER threshold", task_id)
+            with _date_filtered_lock:
+                _date_filtered_task_ids[task_id] = None
+                if len(_date_filtered_task_ids) > _DATE_FILTERED_CACHE_SIZE:
+                    _date_filtered_task_ids.popitem(last=False)
             return None
         
+        # Tasklist and project are resolved once for the exclusion filter and the Task model
+        tasklist_project = self._resolve_tasklist_project(task_data, included)
+        
         # Check if task should be filtered based on sync exclusions
-        if self._should_filter_by_exclusion(task_data, included):
-            logger.info(f"Task {task_id} filtered: project or company is in sync exclusion list")
+        if self._should_filter_by_exclusion(tasklist_project[2], included):
+            logger.info("Task %s filtered: project or company is in sync exclusion list", task_id)
             return None
         
         # Upsert all related entities from included resources (in dependency order)
@@ -84,7 +176,7 @@ class TeamworkEventHandler:
         self._upsert_included_entities(included, task_data)
         
         # Convert to Task model using included data
-        task = self._parse_task(task_data, included)
+        task = self._parse_task(task_data, included, tasklist_project)
         return task
     
     def handle_event(self, event_type: str, payload: Dict[str, Any]) -> None:
@@ -102,101 +194,101 @@ class TeamworkEventHandler:
     def _extract_task_id(self, payload: Dict[str, Any]) -> str:
         """Extract task ID from various payload formats."""
         # Try different payload structures
-        if "task" in payload:
-            return str(payload["task"].get("id", ""))
-        if "id" in payload:
-            return str(payload["id"])
-        if "taskId" in payload:
-            return str(payload["taskId"])
-        if "task_id" in payload:
-            return str(payload["task_id"])
+        task = payload.get("task")
+        if task is not None:
+            return str(task.get("id", ""))
+        for key in _TASK_ID_KEYS:
+            value = payload.get(key)
+            if value is not None:
+                return str(value)
         return ""
     
-    def _parse_task(self, data: Dict[str, Any], included: Dict[str, Any]) -> Task:
+    def _resolve_tasklist_project(
+        self, data: Dict[str, Any], included: Dict[str, Any]
+    ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
-        Parse Teamwork task data into Task model using included resources.
+        Find a task's tasklist and, through it, its project in the included data.
         
         Args:
             data: Task data from API
-            included: Included resources (projects, tasklists, users, companies, teams, tags)
-        """
-        task_id = str(data.get("id", ""))
-        
-        # Parse dates
-        updated_at = None
-        if data.get("updatedAt"):
-            try:
-                updated_at = datetime.fromisoformat(data["updatedAt"].replace("Z", "+00:00"))
-            except (ValueError, AttributeError):
-                pass
-        
-        due_at = None
-        if data.get("dueDate"):
-            try:
-                due_at = datetime.fromisoformat(data["dueDate"].replace("Z", "+00:00"))
-            except (ValueError, AttributeError):
-                pass
+            included: Included resources from API response
         
-        # Extract project and tasklist info from included data
-        project_id = None
-        project_name = None
+        Returns:
+            Tuple of (tasklist_id, tasklist_name, project_id)
+        """
         tasklist_id = None
         tasklist_name = None
+        project_id = None
         
-        # Get tasklist info
-        if data.get("tasklist") and isinstance(data["tasklist"], dict):
-            tasklist_id = str(data["tasklist"].get("id", ""))
-            if tasklist_id and "tasklists" in included:
-                tasklist_data = included["tasklists"].get(tasklist_id, {})
+        tasklist_ref = data.get("tasklist")
+        if type(tasklist_ref) is dict:
+            tasklist_id = str(tasklist_ref.get("id", ""))
+            if tasklist_id:
+                tasklist_data = included.get("tasklists", {}).get(tasklist_id, {})
                 tasklist_name = tasklist_data.get("name")
                 
                 # Get project from tasklist
-                if tasklist_data.get("project") and isinstance(tasklist_data["project"], dict):
-                    project_id = str(tasklist_data["project"].get("id", ""))
+                project_ref = tasklist_data.get("project")
+                if type(project_ref) is dict:
+                    project_id = str(project_ref.get("id", ""))
+        
+        return tasklist_id, tasklist_name, project_id
+    
+    def _parse_task(
+        self,
+        data: Dict[str, Any],
+        included: Dict[str, Any],
+        tasklist_project: Tuple[Optional[str], Optional[str], Optional[str]]
+    ) -> Task:
+        """
+        Parse Teamwork task data into Task model using included resources.
+        
+        Args:
+            data: Task data from API
+            included: Included resources (projects, tasklists, users, companies, teams, tags)
+            tasklist_project: (tasklist_id, tasklist_name, project_id) from _resolve_tasklist_project
+        """
+        get = data.get
+        task_id = str(get("id", ""))
+        
+        # Parse dates
+        updated_at = _parse_iso(get("updatedAt"))
+        due_at = _parse_iso(get("dueDate"))
         
-        # Get project info
-        if project_id and "projects" in included:
-            project_data = included["projects"].get(project_id, {})
-            project_name = project_data.get("name")
+        # Project and tasklist info resolved from included data in process_event
+        tasklist_id, tasklist_name, project_id = tasklist_project
+        project_name = None
+        if project_id:
+            project_name = included.get("projects", {}).get(project_id, {}).get("name")
         
         # Parse tags using included data
-        tags = self._resolve_tags(data.get("tags") or [], included.get("tags", {}))
+        tags = self._resolve_tags(get("tags") or [], included.get("tags", {}))
+        
+        # Display names of included users, built once for assignees, createdBy and updatedBy
+        user_names = {
+            user_id: _user_display_name(user, user_id)
+            for user_id, user in included.get("users", {}).items()
+        }
         
         # Parse assignees - handle users, companies, and teams
         assignees = self._resolve_assignees(
-            data.get("assignees") or [],
-            included.get("users", {}),
+            get("assignees") or [],
+            user_names,
             included.get("companies", {}),
             included.get("teams", {})
         )
         
-        # Parse createdBy
-        created_by = self._resolve_user_name(
-            data.get("createdBy"),
-            included.get("users", {})
-        )
-        
-        # Parse updatedBy
-        updated_by = self._resolve_user_name(
-            data.get("updatedBy"),
-            included.get("users", {})
-        )
+        # Parse createdBy / updatedBy
+        created_by = self._resolve_user_name(get("createdBy"), user_names)
+        updated_by = self._resolve_user_name(get("updatedBy"), user_names)
         
         # Check if deleted/completed
-        deleted = data.get("deleted", False) or data.get("completed", False)
-        deleted_at = None
-        if deleted and data.get("completedAt"):
-            try:
-                deleted_at = datetime.fromisoformat(data["completedAt"].replace("Z", "+00:00"))
-            except (ValueError, AttributeError):
-                pass
+        deleted = bool(get("deleted") or get("completed") or get("deletedAt"))
+        deleted_at = _parse_iso(get("deletedAt") or get("completedAt")) if deleted else None
 
         # Build a web URL
-        source_links = {}
-        if data.get("url"):
-            source_links["teamwork_url"] = data.get("url")
-        else:
-            source_links["teamwork_url"] = self.client.build_task_web_url(task_id)
+        url = get("url")
+        source_links = {"teamwork_url": url or self.client.build_task_web_url(task_id)}
 
         return Task(
             task_id=task_id,
@@ -204,16 +296,16 @@ class TeamworkEventHandler:
             project_name=project_name,
             tasklist_id=tasklist_id,
             tasklist_name=tasklist_name,
-            title=data.get("name") or data.get("title"),
-            description=data.get("description"),
-            status=data.get("status") or data.get("state"),
+            title=get("name") or get("title"),
+            description=get("description"),
+            status=get("status") or get("state"),
             tags=tags,
             assignees=assignees,
             created_by=created_by,
             updated_by=updated_by,
             due_at=due_at,
             updated_at=updated_at or datetime.now(timezone.utc),
-            deleted=deleted or bool(data.get("deletedAt")),
+            deleted=deleted,
             deleted_at=deleted_at,
             source_links=source_links,
             raw=data
@@ -232,28 +324,28 @@ class TeamworkEventHandler:
         """
         tags = []
         for tag_ref in tag_refs:
-            if isinstance(tag_ref, dict):
+            if type(tag_ref) is dict:
                 tag_id = str(tag_ref.get("id", ""))
                 # Check if tag name is in the included data
-                if tag_id and tag_id in tags_included:
-                    tag_name = tags_included[tag_id].get("name", tag_id)
-                    tags.append(tag_name)
+                tag = tags_included.get(tag_id) if tag_id else None
+                if tag is not None:
+                    tags.append(tag.get("name", tag_id))
                 # Fallback to name in the reference itself
-                elif tag_ref.get("name"):
-                    tags.append(tag_ref["name"])
+                else:
+                    tag_name = tag_ref.get("name")
+                    if tag_name:
+                        tags.append(tag_name)
             elif tag_ref:
                 # Direct ID reference
                 tag_id = str(tag_ref)
-                if tag_id in tags_included:
-                    tags.append(tags_included[tag_id].get("name", tag_id))
-                else:
-                    tags.append(tag_id)
+                tag = tags_included.get(tag_id)
+                tags.append(tag.get("name", tag_id) if tag is not None else tag_id)
         return tags
     
     def _resolve_assignees(
         self, 
         assignee_refs: List, 
-        users_included: Dict[str, Any],
+        user_names: Dict[str, str],
         companies_included: Dict[str, Any],
         teams_included: Dict[str, Any]
     ) -> List[str]:
@@ -263,64 +355,49 @@ class TeamworkEventHandler:
         
         Args:
             assignee_refs: List of assignee references with id and type
-            users_included: Included users dictionary
+            user_names: Display names of included users by ID
             companies_included: Included companies dictionary
             teams_included: Included teams dictionary
         
         Returns:
             List of assignee names
         """
+        # Names by assignee type; untyped or unresolved refs try each in this order
+        names_by_type = {
+            "users": user_names,
+            "companies": {cid: c.get("name", cid) for cid, c in companies_included.items()},
+            "teams": {tid: t.get("name", tid) for tid, t in teams_included.items()},
+        }
+        
         assignees = []
         for assignee_ref in assignee_refs:
-            if not isinstance(assignee_ref, dict):
+            if type(assignee_ref) is not dict:
                 continue
             
             assignee_id = str(assignee_ref.get("id", ""))
-            assignee_type = assignee_ref.get("type", "")
-            
             if not assignee_id:
                 continue
             
-            # Resolve based on type
-            if assignee_type == "users" and assignee_id in users_included:
-                user = users_included[assignee_id]
-                first_name = user.get("firstName", "")
-                last_name = user.get("lastName", "")
-                full_name = f"{first_name} {last_name}".strip()
-                assignees.append(full_name or user.get("email", assignee_id))
-            
-            elif assignee_type == "companies" and assignee_id in companies_included:
-                company = companies_included[assignee_id]
-                assignees.append(company.get("name", assignee_id))
-            
-            elif assignee_type == "teams" and assignee_id in teams_included:
-                team = teams_included[assignee_id]
-                assignees.append(team.get("name", assignee_id))
-            
-            else:
-                # Fallback - try all dictionaries
-                if assignee_id in users_included:
-                    user = users_included[assignee_id]
-                    first_name = user.get("firstName", "")
-                    last_name = user.get("lastName", "")
-                    full_name = f"{first_name} {last_name}".strip()
-                    assignees.append(full_name or user.get("email", assignee_id))
-                elif assignee_id in companies_included:
-                    assignees.append(companies_included[assignee_id].get("name", assignee_id))
-                elif assignee_id in teams_included:
-                    assignees.append(teams_included[assignee_id].get("name", assignee_id))
+            names = names_by_type.get(assignee_ref.get("type", ""))
+            name = names.get(assignee_id) if names is not None else None
+            if name is None:
+                for names in names_by_type.values():
+                    name = names.get(assignee_id)
+                    if name is not None:
+                        break
                 else:
-                    assignees.append(assignee_id)
+                    name = assignee_id
+            assignees.append(name)
         
         return assignees
     
-    def _resolve_user_name(self, user_ref: Any, users_included: Dict[str, Any]) -> Optional[str]:
+    def _resolve_user_name(self, user_ref: Any, user_names: Dict[str, str]) -> Optional[str]:
         """
         Resolve a user ID to name using included data.
         
         Args:
             user_ref: User reference (can be ID or dict with id)
-            users_included: Included users dictionary
+            user_names: Display names of included users by ID
         
         Returns:
             User name or None
@@ -328,8 +405,7 @@ class TeamworkEventHandler:
         if not user_ref:
             return None
         
-        user_id = None
-        if isinstance(user_ref, dict):
+        if type(user_ref) is dict:
             user_id = str(user_ref.get("id", ""))
         else:
             user_id = str(user_ref)
@@ -337,14 +413,7 @@ class TeamworkEventHandler:
         if not user_id:
             return None
         
-        if user_id in users_included:
-            user = users_included[user_id]
-            first_name = user.get("firstName", "")
-            last_name = user.get("lastName", "")
-            full_name = f"{first_name} {last_name}".strip()
-            return full_name or user.get("email", user_id)
-        
-        return user_id
+        return user_names.get(user_id, user_id)
     
     def _upsert_included_entities(self, included: Dict[str, Any], task_data: Dict[str, Any]) -> None:
         """
@@ -355,40 +424,25 @@ class TeamworkEventHandler:
             task_data: Task data (to extract specific relationships)
         """
         # Check if db has the new relational methods
-        if not hasattr(self.db, 'upsert_tw_company'):
+        if not self._has_relational:
             logger.debug("Database doesn't support relational structure, skipping entity upserts")
             return
         
+        # Each entity type is written with one statement
         # 1. Upsert companies (no dependencies)
-        if "companies" in included:
-            for company_id, company_data in included["companies"].items():
-                try:
-                    self.db.upsert_tw_company(company_data)
-                except Exception as e:
-                    logger.error(f"Failed to upsert company {company_id}: {e}")
+        self._upsert_changed_entities("companies", included, self.db.upsert_tw_companies_batch)
         
         # 2. Upsert users (depends on companies)
-        if "users" in included:
-            for user_id, user_data in included["users"].items():
-                try:
-                    self.db.upsert_tw_user(user_data)
-                except Exception as e:
-                    logger.error(f"Failed to upsert user {user_id}: {e}")
+        self._upsert_changed_entities("users", included, self.db.upsert_tw_users_batch)
         
         # 3. Upsert teams (no dependencies)
-        if "teams" in included:
-            for team_id, team_data in included["teams"].items():
-                try:
-                    self.db.upsert_tw_team(team_data)
-                    
-                    # Link users to teams if available
-                    # Note: In Teamwork API, team membership is usually in user.teams
-                    # We'll handle this when processing users
-                except Exception as e:
-                    logger.error(f"Failed to upsert team {team_id}: {e}")
+        # Note: In Teamwork API, team membership is usually in user.teams,
+        # so users are linked to teams below
+        self._upsert_changed_entities("teams", included, self.db.upsert_tw_teams_batch)
         
-        # Link users to their teams
+        # Link users to their teams (all users in one call)
         if "users" in included:
+            user_teams = {}
             for user_id, user_data in included["users"].items():
                 try:
                     # Extract team IDs from user data
@@ -403,33 +457,19 @@ class TeamworkEventHandler:
                             team_ids.append(int(team_ref))
                     
                     if team_ids:
-                        self.db.link_user_teams(int(user_id), team_ids)
+                        user_teams[int(user_id)] = team_ids
                 except Exception as e:
-                    logger.error(f"Failed to link user {user_id} to teams: {e}")
+                    logger.error("Failed to link user %s to teams: %s", user_id, e)
+            self.db.link_user_teams_batch(user_teams)
         
         # 4. Upsert tags (may have project dependency)
-        if "tags" in included:
-            for tag_id, tag_data in included["tags"].items():
-                try:
-                    self.db.upsert_tw_tag(tag_data)
-                except Exception as e:
-                    logger.error(f"Failed to upsert tag {tag_id}: {e}")
+        self._upsert_changed_entities("tags", included, self.db.upsert_tw_tags_batch)
         
         # 5. Upsert projects (depends on companies and users)
-        if "projects" in included:
-            for project_id, project_data in included["projects"].items():
-                try:
-                    self.db.upsert_tw_project(project_data)
-                except Exception as e:
-                    logger.error(f"Failed to upsert project {project_id}: {e}")
+        self._upsert_changed_entities("projects", included, self.db.upsert_tw_projects_batch)
         
         # 6. Upsert tasklists (depends on projects)
-        if "tasklists" in included:
-            for tasklist_id, tasklist_data in included["tasklists"].items():
-                try:
-                    self.db.upsert_tw_tasklist(tasklist_data)
-                except Exception as e:
-                    logger.error(f"Failed to upsert tasklist {tasklist_id}: {e}")
+        self._upsert_changed_entities("tasklists", included, self.db.upsert_tw_tasklists_batch)
         
         # 7. Link task to tags (will be done after task is upserted)
         # Extract tag IDs from task data
@@ -468,6 +508,38 @@ class TeamworkEventHandler:
         if assignee_user_ids and hasattr(task_data, '__setitem__'):
             task_data["_assignee_user_ids_to_link"] = assignee_user_ids
     
+    def _upsert_changed_entities(
+        self,
+        entity_type: str,
+        included: Dict[str, Any],
+        upsert_batch: Callable[[List[Dict[str, Any]]], bool]
+    ) -> None:
+        """Upsert one included entity type, skipping entities this process already wrote unchanged."""
+        entities = included.get(entity_type)
+        if not entities:
+            return
+        
+        digests = {(entity_type, str(entity_id)): _entity_digest(entity) for entity_id, entity in entities.items()}
+        with _entity_digests_lock:
+            changed = {}
+            for key, digest in digests.items():
+                if _entity_digests.get(key) == digest:
+                    _entity_digests.move_to_end(key)
+                else:
+                    changed[key] = digest
+        if not changed:
+            return
+        
+        if not upsert_batch([entities[entity_id] for _, entity_id in changed]):
+            return
+        
+        with _entity_digests_lock:
+            for key, digest in changed.items():
+                _entity_digests[key] = digest
+                _entity_digests.move_to_end(key)
+            while len(_entity_digests) > _ENTITY_DIGEST_CACHE_SIZE:
+                _entity_digests.popitem(last=False)
+    
     def _should_filter_by_date(self, task_data: Dict[str, Any]) -> bool:
         """
         Check if task should be filtered based on created date.
@@ -478,52 +550,33 @@ class TeamworkEventHandler:
         Returns:
             True if task should be filtered (skipped), False otherwise
         """
-        if not settings.TEAMWORK_PROCESS_AFTER:
+        threshold_date = self._process_after
+        if threshold_date is None:
             return False
         
-        try:
-            # Parse the threshold date from DD.MM.YYYY format
-            threshold_date = datetime.strptime(settings.TEAMWORK_PROCESS_AFTER, "%d.%m.%Y")
-            threshold_date = threshold_date.replace(tzinfo=timezone.utc)
-            
-            # Parse task created date
-            created_at_str = task_data.get("createdAt")
-            if not created_at_str:
-                # If no created date, don't filter
-                return False
-            
-            created_at = datetime.fromisoformat(created_at_str.replace("Z", "+00:00"))
-            
-            # Filter if created before threshold
-            return created_at < threshold_date
-        
-        except (ValueError, AttributeError) as e:
-            logger.warning(f"Error parsing dates for filtering: {e}")
+        # Parse task created date
+        created_at = _parse_iso(task_data.get("createdAt"))
+        if not created_at:
+            # If no (valid) created date, don't filter
             return False
+        
+        # Filter if created before threshold
+        return created_at < threshold_date
     
-    def _should_filter_by_exclusion(self, task_data: Dict[str, Any], included: Dict[str, Any]) -> bool:
+    def _should_filter_by_exclusion(self, project_id: Optional[str], included: Dict[str, Any]) -> bool:
         """
         Check if task should be filtered based on sync exclusion settings.
         
         Args:
-            task_data: Task data from API
+            project_id: Task's project ID from _resolve_tasklist_project
             included: Included resources (projects, tasklists, etc.)
         
         Returns:
             True if task should be filtered (skipped), False otherwise
         """
-        excluded_companies, excluded_projects = get_sync_filters()
-        if not excluded_companies and not excluded_projects:
+        if _sync_filters_empty:
             return False
-        
-        # Get project ID from task
-        project_id = None
-        if task_data.get("tasklist") and isinstance(task_data["tasklist"], dict):
-            tasklist_id = str(task_data["tasklist"].get("id", ""))
-            if tasklist_id and "tasklists" in included:
-                tasklist_data = included["tasklists"].get(tasklist_id, {})
-                if tasklist_data.get("project") and isinstance(tasklist_data["project"], dict):
-                    project_id = tasklist_data["project"].get("id")
+        excluded_companies, excluded_projects = get_sync_filters()
         
         if project_id:
             try:
@@ -533,8 +586,8 @@ class TeamworkEventHandler:
                     return True
                 
                 # Check if project's company is excluded
-                if excluded_companies and "projects" in included:
-                    project_data = included["projects"].get(str(project_id), {})
+                if excluded_companies:
+                    project_data = included.get("projects", {}).get(str(project_id), {})
                     company_ref = project_data.get("company")
                     if company_ref:
                         company_id = company_ref.get("id") if isinstance(company_ref, dict) else company_ref